@@ -15,6 +15,7 @@ Public methods
     # initializers
         __init__(symbol: str, magnitude: float|int, units: str|Unit) -> None
         .from_string(datum: str) -> Datum
+        .from_strings(lines: Iterable[str]|str|PathLike, columnar: bool = False) -> Iterator[Datum]|Tuple[np.ndarray, ...]
         .from_quantity(quantity: pint.Quantity, symbol: str) -> Datum
         .as_datum(d: Datum|Quantity|str, symbol: str = '') -> Datum
 
@@ -32,23 +33,25 @@ Public methods
     # Datum analysis
         .get_decimals(value: float|int|str) -> int
         .is_compatible(other: Datum|Quantity|str|Unit) -> bool
+        .isclose(other: Datum, rel_tol: float = 1e-9, abs_tol: float = 0.0) -> bool|np.ndarray
 
     # mutators
         .to(units: str|Unit, in_place: bool = False) -> Optional[Datum]
         .ito(units: str|Unit) -> None
         .to_base_units(in_place: bool = False) -> Optional[Datum]
         .ito_base_units() -> None
-        .scale(factor: float|int, in_place: bool = False) -> Optional[Datum]
-        .iscale(factor: float|int) -> None
+        .scale(factor: float|int|np.ndarray, in_place: bool = False) -> Optional[Datum]
+        .iscale(factor: float|int|np.ndarray) -> None
 
     # properties
         .quantity -> Quantity
         .symbol -> str
         .sp_symbol -> sympy.Symbol
-        .magnitude -> float|int
+        .magnitude -> float|np.ndarray
         .units -> Unit
         .units_str -> str
         .base_quantity -> Quantity
+        .base_magnitude -> float|np.ndarray
         .base_units -> Unit
         .base_units_str -> str
         .num_decimals -> int
@@ -58,39 +61,85 @@ Public methods
 from __future__ import annotations
 
 from pint import UnitRegistry, Quantity, Unit, DimensionalityError
-from sympy.parsing.sympy_parser import parse_expr
-from sympy import Symbol
 from copy import copy
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Optional, Tuple, Dict, FrozenSet, Callable, Iterable, Iterator, TYPE_CHECKING
+from keyword import iskeyword
+from os import PathLike
+
+import builtins
+import re
+import numpy as np
 
 from QCalculator.Exceptions.DatumExceptions import InvalidSymbol, InitializationError, IncompatibleUnits
+from QCalculator.UnitCache import UnitCache
+from QCalculator._sympy_names import SYMPY_NAMES
+
+if TYPE_CHECKING:
+    from sympy import Symbol  # sympy is imported only when needed, see ._sympy_symbol_check() and .sp_symbol
+
+
+class _LazyClassAttribute:
+    """
+    Class attribute computed by "factory" on the first access and then stored on the class in place of the descriptor.
+    """
+
+    def __init__(self, factory: Callable) -> None:
+        self._factory = factory
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance, owner: type):
+        value = self._factory()
+        setattr(owner, self._name, value)
+        return value
 
 
 # class implementation
 class Datum:
-    ureg = UnitRegistry(system='SI')
+    # the magnitude and the units in base units are computed once per value and kept along with the value; the
+    # Quantity is created only when needed
+    __slots__ = ('_symbol', '_magnitude', '_units', '_base_magnitude', '_base_units', '_quantity')
+
+    # the UnitRegistry is built on the first use; the parsed unit definitions are cached on disk in UNITS_CACHE_FOLDER
+    # (see pint's "cache_folder"; ':auto:' is the user's cache directory, None disables the cache)
+    UNITS_CACHE_FOLDER: Optional[str] = ':auto:'
+    ureg = _LazyClassAttribute(lambda: UnitRegistry(system='SI', cache_folder=Datum.UNITS_CACHE_FOLDER))
+    units_cache = _LazyClassAttribute(lambda: UnitCache(Datum.ureg))  # shared canonical Units, see .normalize_units()
     _FORBIDDEN_SYMBOLS: Tuple[str] = ('', ' ')
+    # grammar of the definition strings "<symbol> = <magnitude> <units>" for .from_strings()
+    _DEFINITION = re.compile(r'\s*(?P<symbol>[^=]*?)\s*=\s*(?P<magnitude>\S+)(?:\s+(?P<units>.*?))?\s*')
+    # names parse_expr() resolves to sympy objects or Python builtins instead of creating a Symbol (a static list, so
+    # that checking plain identifiers does not import sympy)
+    _RESERVED_NAMES: FrozenSet[str] = SYMPY_NAMES | frozenset(dir(builtins))
     ROUNDING: int = 15
     # is needed to remove 1's after calculations in Formula. Removal is needed for hash function to work properly
     # Do not set ROUNDING to more than 15. If equal Datums a said to be different, try setting it to 14 or 13.
 
     def __init__(self,
                  symbol: str,
-                 magnitude: float|int,
+                 magnitude: float|int|np.ndarray,
                  units: str|Unit
                  ) -> None:
+        """
+        The magnitude is either a number or an array of numbers (a list, a tuple or a NumPy array), e.g. a column of
+        measurements of the same variable in the same units. Array magnitudes are stored as read-only float arrays, and
+        the arithmetic methods work on them element-wise.
+        """
 
         if not isinstance(symbol, str):
             raise TypeError('Symbol for Datum must be given as a string.')
 
         if Datum._sympy_symbol_check(symbol) and not Datum._symbol_forbidden(symbol):
             self._symbol: str = symbol
-            self._magnitude: float = float(magnitude)
 
             try:
-                self._units: Unit = Datum.normalize_units(units)
+                units = Datum.normalize_units(units)
             except TypeError as te:
                 raise InitializationError((symbol, magnitude, str(units)), details='Check that the units are of correct type.') from te
+
+            self._set_value(Datum._as_magnitude(magnitude), units)
         else:
             raise InitializationError(
                 symbol,
@@ -104,7 +153,7 @@ class Datum:
 
         if sp_check and fs_check:
             units = Datum.normalize_units(quantity.units)
-            return Datum(symbol, quantity.magnitude, units)
+            return Datum._trusted(symbol, quantity.magnitude, units)
 
         elif not sp_check:
             raise InitializationError(
@@ -158,6 +207,44 @@ class Datum:
 
         return Datum(symbol, number, units)
 
+    @staticmethod
+    def from_strings(
+            lines: Iterable[str]|str|PathLike,
+            columnar: bool = False
+    ) -> Iterator[Datum]|Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Bulk counterpart of .from_string() for many definition strings, e.g. an open text file with one definition per
+        line (a path, given as str or path-like object, is opened as such a file; a single definition string is
+        therefore not accepted, use .from_string() for it). Blank lines are skipped. Every distinct symbol is validated
+        and every distinct unit string is parsed only once.
+
+        By default, the Datums are created lazily, one per line. With "columnar" set to True, no Datums are created
+        and the tuple of arrays (symbols, magnitudes, units) is returned instead; the units are Datum.ureg Units.
+
+        :param lines: iterable of definition strings or a path to a text file
+        :param columnar: if True, return arrays instead of Datums
+        :return: iterator of Datums, or the tuple (symbols, magnitudes, units)
+        """
+
+        if isinstance(lines, (str, PathLike)):
+            def read_file(path: str|PathLike) -> Iterator[str]:
+                with open(path) as file:
+                    yield from file
+            lines = read_file(lines)
+
+        records = Datum._parse_definitions(lines)
+
+        if not columnar:
+            return (Datum._trusted(symbol, magnitude, units) for symbol, magnitude, units in records)
+
+        symbols, magnitudes, units = [], [], []
+        for symbol, magnitude, u in records:
+            symbols.append(symbol)
+            magnitudes.append(magnitude)
+            units.append(u)
+
+        return np.array(symbols, dtype=object), np.array(magnitudes, dtype=float), np.array(units, dtype=object)
+
     @staticmethod
     def as_datum(
             d: Datum|Quantity|str,
@@ -168,7 +255,7 @@ class Datum:
         requires passing in "symbol" parameter."""
 
         if isinstance(d, Datum):
-            newd = Datum(d.symbol, d.magnitude, d.units)
+            newd = Datum._trusted(d.symbol, d.magnitude, d.units)
             return newd
             # so that changes of the returned object do not affect the original one and vice versa
             # copy() is not used, because magnitude must be rounded initially.
@@ -196,20 +283,7 @@ class Datum:
         :return:
         """
 
-        from math import isclose
-
-        self_q = self.quantity
-        other_q = other.quantity
-
-        self_mag = self_q.to_base_units().magnitude
-        other_mag = other_q.to_base_units().magnitude
-
-        conditions = [
-            self.base_units == other.base_units,
-            isclose(self_mag, other_mag),
-            self.symbol == other.symbol
-        ]
-        return all(conditions)
+        return np.shape(self._magnitude) == np.shape(other._magnitude) and bool(np.all(self.isclose(other)))
 
     def __hash__(self):
         return hash(self.symbol)
@@ -271,36 +345,40 @@ class Datum:
 
     # mutators
     def to(self, unit: str | Datum.ureg.Unit, in_place: bool = False) -> Optional[Datum]:
+        """Converts the Datum to "unit" with the conversion factor cached in Datum.units_cache."""
+
+        units = Datum.normalize_units(unit)
+
         try:
-            new_q = self.quantity.to(unit)
-            if in_place:
-                self._magnitude = new_q.magnitude
-                self._units = new_q.units
-            else:
-                return Datum.from_quantity(self.symbol, new_q)
+            magnitude = Datum.units_cache.convert(self._magnitude, self._units, units)
         except DimensionalityError as e:
             raise IncompatibleUnits(from_unit=self.units_str, to_unit=unit) from e
 
+        if in_place:
+            self._set_value(Datum._as_magnitude(magnitude), units)
+        else:
+            return Datum._trusted(self._symbol, magnitude, units)
+
     def ito(self, unit: str | Datum.ureg.Unit) -> None:
         self.to(unit, in_place=True)
 
     def to_base_units(self, in_place: bool = False) -> Optional[Datum]:
-        return self.to(self.base_units_str, in_place=in_place)
+        return self.to(self.base_units, in_place=in_place)
 
     def ito_base_units(self) -> None:
         self.to(self.base_units, in_place=True)
 
-    def scale(self, factor: float|int, in_place: bool = False) -> Optional[Datum]:
-        if not isinstance(factor, (float, int)):
-            raise TypeError(f'Expected float or int, got "{type(factor)}".')
+    def scale(self, factor: float|int|np.ndarray, in_place: bool = False) -> Optional[Datum]:
+        if not isinstance(factor, (float, int, np.ndarray)):
+            raise TypeError(f'Expected float, int or numpy.ndarray, got "{type(factor)}".')
 
         if in_place:
-            self._magnitude = factor * self.magnitude
+            self._set_value(Datum._as_magnitude(factor * self.magnitude), self.units)
             return None
         else:
-            return Datum(self.symbol, self.magnitude * factor, self.units_str)
+            return Datum._trusted(self.symbol, self.magnitude * factor, self.units)
 
-    def iscale(self, factor: float|int) -> None:
+    def iscale(self, factor: float|int|np.ndarray) -> None:
         self.scale(factor, in_place=True)
 
     def pow(self, power: float|int) -> Quantity:
@@ -311,8 +389,11 @@ class Datum:
     # normalizers
     @staticmethod
     def normalize_units(u: str|Unit|Quantity) -> Unit|Quantity:
+        """Returns the Unit of the local UnitRegistry for "u" (or the Quantity with such units). Units are interned by
+        Datum.units_cache, so equal units are parsed once and share the same Unit instance."""
+
         if isinstance(u, (str, Unit)):
-            return Datum.ureg.Unit(u)
+            return Datum.units_cache.unit(u)
 
         elif isinstance(u, Quantity):
             units = Datum.normalize_units(u.units)
@@ -369,14 +450,132 @@ class Datum:
         else:
             raise TypeError(f'Expected "Datum", "pint.Quantity", "str", or "Datum.ureg.Unit", got "{type(other)}"')
 
+    def isclose(self, other: Datum, rel_tol: float = 1e-9, abs_tol: float = 0.0) -> bool|np.ndarray:
+        """
+        Tolerance-based equality of the magnitudes in base units, element-wise for array magnitudes (the tolerances
+        are those of math.isclose). Datums with different symbols or base units are never close.
+        """
+
+        if self._symbol != other._symbol or self._base_units != other._base_units:
+            shape = np.broadcast_shapes(np.shape(self._magnitude), np.shape(other._magnitude))
+            return np.zeros(shape, dtype=bool) if shape else False
+
+        a, b = self._base_magnitude, other._base_magnitude
+        with np.errstate(invalid='ignore'):
+            res = (a == b) | (np.abs(a - b) <= np.maximum(rel_tol * np.maximum(np.abs(a), np.abs(b)), abs_tol))
+        return res if np.ndim(res) else bool(res)
+
     # private helpers
     @staticmethod
+    def _parse_definitions(lines: Iterable[str]) -> Iterator[Tuple[str, float, Unit]]:
+        """Yields (symbol, magnitude, units) for each non-blank definition string, see .from_strings()."""
+
+        match = Datum._DEFINITION.fullmatch
+        valid = set()
+        units_seen: Dict[str, Unit] = dict()
+
+        for n, line in enumerate(lines, start=1):
+            m = match(line)
+
+            if m is None:
+                if line.strip():
+                    raise InitializationError(
+                        line.strip(),
+                        details=f'Invalid Datum definition string on line {n}. Check the format: '
+                                f'<symbol> = <magnitude> <units> (including spaces).'
+                    )
+                continue
+
+            symbol, magnitude, units = m.group('symbol', 'magnitude', 'units')
+
+            if symbol not in valid:
+                if Datum._symbol_forbidden(symbol) or not Datum._sympy_symbol_check(symbol):
+                    raise InitializationError(symbol, details=f'Invalid symbol on line {n}.')
+                valid.add(symbol)
+
+            try:
+                magnitude = float(magnitude)
+            except ValueError as e:
+                raise InitializationError(
+                    magnitude,
+                    details=f'Invalid magnitude on line {n}. Check that you have a space between the magnitude and '
+                            f'the units of the Datum.'
+                ) from e
+
+            units = units or ''
+            if units not in units_seen:
+                try:
+                    units_seen[units] = Datum.units_cache.unit(units)
+                except Exception as e:  # pint raises several unrelated exception types for malformed units
+                    raise InitializationError(units, details=f'Invalid units on line {n}.') from e
+
+            yield symbol, magnitude, units_seen[units]
+
+    @staticmethod
+    def _trusted(symbol: str, magnitude: float|int|np.ndarray, units: Unit) -> Datum:
+        """
+        Creates a Datum without validating the symbol and normalizing the units. Only for Datums produced inside the
+        package: "symbol" must come from a valid Datum or Formula, and "units" must be a Unit of Datum.ureg.
+        """
+
+        d = Datum.__new__(Datum)
+        d._symbol = symbol
+        d._set_value(Datum._as_magnitude(magnitude), units)
+        return d
+
+    @staticmethod
+    def _as_magnitude(magnitude: float|int|np.ndarray) -> float|np.ndarray:
+        """Converts a magnitude to float, or an array-like magnitude to a read-only float array."""
+
+        if isinstance(magnitude, (np.ndarray, list, tuple)):
+            magnitude = np.array(magnitude, dtype=float)
+            magnitude.flags.writeable = False  # the base magnitude must stay in sync
+            return magnitude
+
+        return float(magnitude)
+
+    def _set_value(self, magnitude: float|np.ndarray, units: Unit) -> None:
+        """Sets the value of the Datum and updates the magnitude and the units in base units accordingly."""
+
+        self._magnitude = magnitude
+        self._units = units
+        self._quantity = None
+
+        info = Datum.units_cache.info(units)
+
+        if info.factor is not None:
+            self._base_magnitude: float|np.ndarray = info.factor * magnitude + info.offset
+            self._base_units: Unit = info.base_units
+        else:  # non-linear units
+            bq = Datum.ureg.Quantity(magnitude, units).to_base_units()
+            self._base_magnitude = bq.magnitude
+            self._base_units = bq.units
+
+        if isinstance(self._base_magnitude, np.ndarray):
+            self._base_magnitude.flags.writeable = False
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
     def _sympy_symbol_check(symbol: str) -> bool:
-        try:
-            parse_expr(f'{symbol} - 1')
-        except TypeError:
-            return False
-        return True
+        """
+        Returns True if "symbol" is parsed as a sympy Symbol. Plain identifiers that are not Python keywords or names
+        known to parse_expr() pass without parsing; the results of the 1024 most recently checked symbols are cached
+        (the same bound as the default size of UnitCache).
+        """
+
+        if symbol.isidentifier() and not iskeyword(symbol) and symbol not in Datum._RESERVED_NAMES:
+            res = True
+        else:
+            from sympy.parsing.sympy_parser import parse_expr
+
+            try:
+                parse_expr(f'{symbol} - 1')
+            except TypeError:
+                res = False
+            else:
+                res = True
+
+        return res
 
     @staticmethod
     def _symbol_forbidden(symbol: str) -> bool:
@@ -396,7 +595,9 @@ class Datum:
     # properties
     @property
     def quantity(self) -> Quantity:
-        return self.magnitude * self.units
+        if self._quantity is None:
+            self._quantity = Datum.ureg.Quantity(self._magnitude, self._units)
+        return copy(self._quantity)  # a copy, since Quantity is mutable
 
     @property
     def symbol(self) -> str:
@@ -404,10 +605,11 @@ class Datum:
 
     @property
     def sp_symbol(self) -> Symbol:
+        from sympy import Symbol
         return Symbol(self.symbol)
 
     @property
-    def magnitude(self) -> float|int:
+    def magnitude(self) -> float|np.ndarray:
         return self._magnitude
 
     @property
@@ -420,13 +622,15 @@ class Datum:
 
     @property
     def base_quantity(self) -> Quantity:
-        return self.quantity.to_base_units()
+        return Datum.ureg.Quantity(self._base_magnitude, self._base_units)
+
+    @property
+    def base_magnitude(self) -> float|np.ndarray:
+        return self._base_magnitude
 
     @property
     def base_units(self) -> Unit:
-        bq = self.base_quantity
-        bu = bq.units
-        return bu
+        return self._base_units
 
     @property
     def base_units_str(self) -> str:
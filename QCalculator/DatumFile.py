@@ -0,0 +1,222 @@
+"""
+Purpose: store large collections of Datums in a compact binary file and read them back without parsing, either as
+zero-copy (memory-mapped) arrays or as Datums created on access.
+
+File layout (little-endian)
+    - magic bytes b'QCDATUM1'
+    - header: number of records, number of symbols, number of units (uint64, uint32, uint32)
+    - symbol table: for each symbol its length (uint32) and UTF-8 bytes
+    - unit table: for each unit the length (uint32) and UTF-8 bytes of its string representation
+    - padding to a multiple of 8 bytes
+    - symbol indices (uint32 per record), unit indices (uint32 per record)
+    - padding to a multiple of 8 bytes
+    - magnitudes (float64 per record)
+
+Invariants
+    - the magnitudes are stored exactly (float64), so a round-trip does not lose precision
+    - only Datums with scalar magnitudes can be written
+
+Public methods
+    # writer
+        .write(path: str|PathLike, datums: Iterable[Datum]|Tuple[Sequence, Sequence, Sequence]) -> None
+
+    # reader
+        __init__(path: str|PathLike, mmap: bool = True) -> None
+        .columns() -> Tuple[np.ndarray, np.ndarray, np.ndarray]
+        .close() -> None  # the views obtained before stay valid
+
+    # properties
+        .symbol_table -> Tuple[str, ...]
+        .unit_table -> Tuple[Unit, ...]
+        .symbol_index -> np.ndarray
+        .unit_index -> np.ndarray
+        .magnitudes -> np.ndarray
+"""
+
+
+from __future__ import annotations
+
+import struct
+from os import PathLike
+from typing import Iterable, Tuple, Sequence, Dict, List, Iterator
+
+import numpy as np
+from pint import Unit
+
+from QCalculator.Datum import Datum
+from QCalculator.Exceptions.DatumExceptions import InitializationError
+
+
+class DatumFile:
+    MAGIC = b'QCDATUM1'
+    _HEADER = struct.Struct('<QII')
+    _LENGTH = struct.Struct('<I')
+
+    def __init__(self, path: str|PathLike, mmap: bool = True) -> None:
+        """
+        Opens a file written by DatumFile.write(). With "mmap" set to True, the index and magnitude arrays are
+        read-only views of the memory-mapped file; otherwise they are read into memory. The symbol table is validated
+        once, so that the Datums can be created without validation on access.
+        """
+
+        with open(path, 'rb') as file:
+            if file.read(len(DatumFile.MAGIC)) != DatumFile.MAGIC:
+                raise ValueError(f'"{path}" is not a Datum file.')
+
+            n, n_symbols, n_units = DatumFile._HEADER.unpack(file.read(DatumFile._HEADER.size))
+            symbols = DatumFile._read_table(file, n_symbols)
+            units = DatumFile._read_table(file, n_units)
+            offset = DatumFile._aligned(file.tell())
+
+        DatumFile._check_symbols(symbols)
+        self._symbol_table: Tuple[str, ...] = tuple(symbols)
+        self._unit_table: Tuple[Unit, ...] = tuple([Datum.normalize_units(u) for u in units])
+
+        arrays = list()
+        for dtype in (np.uint32, np.uint32, np.float64):
+            if dtype is np.float64:
+                offset = DatumFile._aligned(offset)
+
+            if mmap and n > 0:
+                arr = np.memmap(path, dtype=np.dtype(dtype).newbyteorder('<'), mode='r', offset=offset, shape=(n,))
+            else:
+                arr = np.fromfile(path, dtype=np.dtype(dtype).newbyteorder('<'), count=n, offset=offset)
+                arr.flags.writeable = False
+
+            arrays.append(arr)
+            offset += n * np.dtype(dtype).itemsize
+
+        self._symbol_index, self._unit_index, self._magnitudes = arrays
+
+    def __len__(self) -> int:
+        return len(self._magnitudes)
+
+    def __getitem__(self, i: int) -> Datum:
+        return Datum._trusted(
+            self._symbol_table[self._symbol_index[i]],
+            float(self._magnitudes[i]),
+            self._unit_table[self._unit_index[i]]
+        )
+
+    def __iter__(self) -> Iterator[Datum]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __enter__(self) -> DatumFile:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # writer
+    @staticmethod
+    def write(
+            path: str|PathLike,
+            datums: Iterable[Datum]|Tuple[Sequence[str], Sequence[float], Sequence[str|Unit]]
+    ) -> None:
+        """
+        Writes Datums to "path". Instead of Datums, the columns (symbols, magnitudes, units) can be given, e.g. as
+        returned by Datum.from_strings(..., columnar=True) or DatumFile.columns().
+        """
+
+        if isinstance(datums, tuple) and len(datums) == 3 and not isinstance(datums[0], Datum):
+            symbols, magnitudes, units = datums
+            magnitudes = np.asarray(magnitudes, dtype=float)
+        else:
+            symbols, mags, units = list(), list(), list()
+            for d in datums:
+                if np.ndim(d.magnitude):
+                    raise TypeError(f'Only Datums with scalar magnitudes can be written, got "{d.symbol}".')
+                symbols.append(d.symbol)
+                mags.append(d.magnitude)
+                units.append(d.units)
+            magnitudes = np.asarray(mags, dtype=float)
+
+        if not len(symbols) == len(magnitudes) == len(units):
+            raise ValueError('The columns must have the same length.')
+
+        symbol_table, symbol_index = DatumFile._intern(symbols)
+        DatumFile._check_symbols(symbol_table)
+        unit_table, unit_index = DatumFile._intern([str(Datum.normalize_units(u)) for u in units])
+
+        with open(path, 'wb') as file:
+            file.write(DatumFile.MAGIC)
+            file.write(DatumFile._HEADER.pack(len(magnitudes), len(symbol_table), len(unit_table)))
+
+            for table in (symbol_table, unit_table):
+                for entry in table:
+                    b = entry.encode('utf-8')
+                    file.write(DatumFile._LENGTH.pack(len(b)))
+                    file.write(b)
+
+            file.write(b'\0' * (DatumFile._aligned(file.tell()) - file.tell()))
+            file.write(np.asarray(symbol_index, dtype='<u4').tobytes())
+            file.write(np.asarray(unit_index, dtype='<u4').tobytes())
+            file.write(b'\0' * (DatumFile._aligned(file.tell()) - file.tell()))
+            file.write(magnitudes.astype('<f8').tobytes())
+
+    # reader
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (symbols, magnitudes, units) as in Datum.from_strings(..., columnar=True); magnitudes is a view."""
+
+        symbols = np.array(self._symbol_table, dtype=object)[self._symbol_index]
+        units = np.array(self._unit_table, dtype=object)[self._unit_index]
+        return symbols, self._magnitudes, units
+
+    def close(self) -> None:
+        """
+        Drops the references to the memory-mapped arrays. The mapping itself is released when the last view of it
+        (e.g. one returned by .magnitudes or .columns()) is garbage-collected, so such views stay valid.
+        """
+
+        for name in ('_symbol_index', '_unit_index', '_magnitudes'):
+            arr = getattr(self, name)
+            setattr(self, name, np.empty(0, dtype=arr.dtype))
+
+    # private helpers
+    @staticmethod
+    def _aligned(offset: int) -> int:
+        return -(-offset // 8) * 8
+
+    @staticmethod
+    def _check_symbols(symbols: Iterable[str]) -> None:
+        """Raises InitializationError for the first symbol that cannot be the symbol of a Datum."""
+
+        for s in symbols:
+            if not isinstance(s, str) or Datum._symbol_forbidden(s) or not Datum._sympy_symbol_check(s):
+                raise InitializationError(s, details='Invalid symbol in the symbol table of a Datum file.')
+
+    @staticmethod
+    def _intern(values: Iterable[str]) -> Tuple[List[str], List[int]]:
+        table: Dict[str, int] = dict()
+        index = [table.setdefault(v, len(table)) for v in values]
+        return list(table), index
+
+    @staticmethod
+    def _read_table(file, n: int) -> List[str]:
+        table = list()
+        for _ in range(n):
+            (length,) = DatumFile._LENGTH.unpack(file.read(DatumFile._LENGTH.size))
+            table.append(file.read(length).decode('utf-8'))
+        return table
+
+    # properties
+    @property
+    def symbol_table(self) -> Tuple[str, ...]:
+        return self._symbol_table
+
+    @property
+    def unit_table(self) -> Tuple[Unit, ...]:
+        return self._unit_table
+
+    @property
+    def symbol_index(self) -> np.ndarray:
+        return self._symbol_index
+
+    @property
+    def unit_index(self) -> np.ndarray:
+        return self._unit_index
+
+    @property
+    def magnitudes(self) -> np.ndarray:
+        return self._magnitudes
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from numbers import Number
+from numbers import Real
 
 from QCalculator.Exceptions.FormulaExceptions import (
     RewritingError, IncompatibleUnitsError, OverlappingVariables, InvalidSymbol, WrongUnitEquation,
@@ -9,11 +9,88 @@ from QCalculator.Exceptions.FormulaExceptions import (
 )
 from QCalculator import Datum
 
-from typing import Dict, Optional, List, overload, Set, Iterable
+from typing import Dict, Optional, List, overload, Set, Iterable, Tuple, Callable, FrozenSet, Mapping
+from types import MappingProxyType
 from pint import Unit
-from sympy import parse_expr, Eq, solve, Float, simplify, im, Symbol
+from sympy import parse_expr, Eq, solve, Float, simplify, im, Symbol, Expr, Rational, lambdify, together, fraction
 from copy import deepcopy, copy
 
+import builtins
+import math
+import sys
+import numpy as np
+
+
+def _real_part(l):
+    """
+    Returns the real part of a numeric solution (or of an array of solutions) where the solution is real within
+    Formula.IMAG_TOL, and NaN elsewhere. Returns None for symbolic solutions.
+    """
+
+    if isinstance(l, np.ndarray):
+        with np.errstate(invalid='ignore'):
+            return np.where(np.abs(np.imag(l)) <= Formula.IMAG_TOL * np.abs(l), np.real(l), np.nan)
+
+    try:
+        c = complex(l)
+    except TypeError:
+        return None
+
+    return c.real if abs(c.imag) <= Formula.IMAG_TOL * abs(c) else math.nan
+
+
+def _real_filter(l):
+    r = _real_part(l)
+
+    if r is None:  # symbolic solution
+        return simplify(im(l)) == 0
+
+    with np.errstate(invalid='ignore'):
+        return np.isfinite(r) if isinstance(r, np.ndarray) else math.isfinite(r)
+
+
+def _sign_filter(test: Callable) -> Callable:
+    """
+    Makes a filter keeping the real solutions for which test(real part, Formula.ZERO_TOL) holds. Complex solutions are
+    always discarded.
+    """
+
+    def fil(l):
+        r = _real_part(l)
+
+        if r is None:  # symbolic solution
+            return test(l, 0.0)
+
+        with np.errstate(invalid='ignore'):
+            return test(r, Formula.ZERO_TOL)
+
+    return fil
+
+
+def _no_filter(l):
+    return np.ones(np.shape(l), dtype=bool) if isinstance(l, np.ndarray) else True
+
+
+def _lambdify(args: Iterable[str], exprs, modules: str) -> Optional[Callable]:
+    """
+    Lambdifies "exprs" as a function of the symbols "args". Returns None if an expression uses a function that
+    "modules" lacks (e.g. erfinv or besselj with 'math'); lambdify() leaves such names undefined, and calling the
+    function would raise NameError. None is also returned if the printer of "modules" cannot print an expression
+    (e.g. Abs with 'math'). The callers fall back to sympy in that case.
+    """
+
+    try:
+        func = lambdify([Symbol(a) for a in args], exprs, modules=modules, dummify=True)
+    except (NotImplementedError, SyntaxError, TypeError, ValueError):  # PrintMethodNotImplementedError and the like
+        return None
+
+    defined = func.__globals__
+
+    if all([n in defined or hasattr(builtins, n) for n in func.__code__.co_names]):
+        return func
+
+    return None
+
 
 class Formula:
     """
@@ -36,33 +113,110 @@ class Formula:
         t = 49.74 second
     """
 
-    REAL_ONLY = lambda l: simplify(im(l)) == 0
-    POSITIVES = lambda l: l > 0.0
-    NEGATIVES = lambda l: l < 0.0
-    NON_NEG = lambda l: l >= 0.0
-    NON_POS = lambda l: l <= 0.0
-    ZERO = lambda l: l == 0.0
-    NO_FILTER = lambda l: l
-
-
-    def __init__(self, eq: str, ref_units: Optional[Dict[str, str|Unit]] = None):
+    # solutions with an imaginary part below IMAG_TOL * |solution| are taken as real; real solutions within ZERO_TOL
+    # of zero are taken as zero by the sign filters
+    IMAG_TOL = 1e-12
+    ZERO_TOL = 0.0
+
+    # numeric filters for the solutions (see .eval()). Each filter accepts a single solution as well as an array of
+    # solutions (returning a boolean array). Filters can also be passed to .eval() and .solve() by their names.
+    FILTERS: Dict[str, Callable] = {
+        'real': _real_filter,
+        'positive': _sign_filter(lambda r, tol: r > tol),
+        'negative': _sign_filter(lambda r, tol: r < -tol),
+        'non-negative': _sign_filter(lambda r, tol: r >= -tol),
+        'non-positive': _sign_filter(lambda r, tol: r <= tol),
+        'zero': _sign_filter(lambda r, tol: abs(r) <= tol),
+        'none': _no_filter,
+    }
+
+    REAL_ONLY = FILTERS['real']
+    POSITIVES = FILTERS['positive']
+    NEGATIVES = FILTERS['negative']
+    NON_NEG = FILTERS['non-negative']
+    NON_POS = FILTERS['non-positive']
+    ZERO = FILTERS['zero']
+    NO_FILTER = FILTERS['none']
+
+    # symbolic solutions shared by all Formula instances: (equation, unknown) -> solutions, or None if sympy cannot
+    # solve the equation for the unknown or the equation is too costly to solve symbolically
+    _SOLUTIONS: Dict[Tuple[Eq, str], Optional[List[Expr]]] = dict()
+    # the solutions compiled into numeric functions: (equation, unknown) -> (arguments, solutions, function). None is
+    # stored when there are no symbolic solutions or neither math nor mpmath can evaluate them.
+    _COMPILED: Dict[Tuple[Eq, str], Optional[Tuple[Tuple[str, ...], List[Expr], Callable]]] = dict()
+    # the same solutions lambdified with numpy for .solve_batch(): (equation, unknown) -> function or None if numpy lacks
+    # some of the functions
+    _VECTORIZED: Dict[Tuple[Eq, str], Optional[Callable]] = dict()
+    # linear forms of the equations: (equation, unknowns) -> (arguments, function) or None if not linear
+    _LINEAR: Dict[Tuple[Eq, FrozenSet[str]], Optional[Tuple[Tuple[str, ...], Callable]]] = dict()
+    # residuals LHS - RHS and their derivatives for the numeric solver: (equation, unknown) -> (arguments, f, df) or
+    # None if the math module lacks some of the functions
+    _NUMERIC: Dict[Tuple[Eq, str], Optional[Tuple[Tuple[str, ...], Callable, Callable]]] = dict()
+    # polynomial coefficients (highest degree first): (equation, unknown) -> (arguments, degree, function) or None if
+    # the equation is not a polynomial of at least the second degree in the unknown
+    _POLYNOMIAL: Dict[Tuple[Eq, str], Optional[Tuple[Tuple[str, ...], int, Callable]]] = dict()
+    # both sides of the equations for the consistency checks, as functions of all the symbols in .symbol_tuple order:
+    # (equation, vectorized) -> function returning [LHS, RHS], or None if the module lacks some of the functions (the
+    # sides are then evaluated by substitution)
+    _SIDES: Dict[Tuple[Eq, bool], Optional[Callable]] = dict()
+
+    # the numeric solver scans the grid 0, +-10**(k / NUMERIC_STEPS) for |k| <= NUMERIC_DECADES * NUMERIC_STEPS for
+    # sign changes of the residual and refines every bracket with at most NUMERIC_MAXITER Newton/bisection steps. If
+    # there are none, the grid is extended to the whole float range (NUMERIC_MAX_DECADES).
+    NUMERIC_DECADES = 30
+    NUMERIC_MAX_DECADES = int(math.log10(sys.float_info.max))
+    NUMERIC_STEPS = 4
+    NUMERIC_MAXITER = 100
+    # polynomial roots with a relative imaginary part below this are taken as real (eigenvalues of the companion
+    # matrix split multiple real roots into complex pairs of roughly this size)
+    POLYNOMIAL_IMAG_TOL = 1e-7
+    # m roots within POLYNOMIAL_CLUSTER_TOL * eps**(1/m) of their mean (relative) are taken as one root of multiplicity
+    # m: the eigenvalues scatter a root of multiplicity m by about eps**(1/m)
+    POLYNOMIAL_CLUSTER_TOL = 10.0
+    # the sides of a consistent equation agree within these tolerances (as in math.isclose). 15 digits are the last
+    # digits not affected by operations with float in Python (abs_tol); one of the sides is often zero due to the
+    # standard way of writing equations in Formula.
+    CONSISTENCY_REL_TOL = 1e-12
+    CONSISTENCY_ABS_TOL = 1e-15
+    # the closed-form solutions are general (e.g. x = y**2 for y = sqrt(x)), so each computed root is checked: the
+    # residual LHS - RHS must be within the consistency tolerances, or not larger than the change of the residual when
+    # the root is moved by ROOT_REL_TOL (relative). Spurious roots leave a residual of the order of the sides.
+    ROOT_REL_TOL = 1e-9
+
+
+    def __init__(self, eq: str, ref_units: Optional[Dict[str, str|Unit]] = None, compiled: bool = True):
         """
         Accepts a string that can be parsed as a sympy expression. Optionally accepts the reference units dict that is
         used to control the units of a Datum that is written with .write(). In the case the units are not compatible,
         an exception will be raised. If ref_units is None, then control is turned off.
 
+        In the compiled mode the equation is solved symbolically only once for each unknown, and the closed-form
+        solutions are turned into plain numeric functions of the base-unit magnitudes (see ._compile()). The numeric
+        evaluation falls back to substitution and sympy solve() whenever the compiled solution cannot be used.
+
         :param eq: an expression that will be parsed into sympy Eq
         :param ref_units: a dict of units used to control the units of written variables
+        :param compiled: if True, .eval() uses the cached compiled solutions instead of solving the equation each time
         """
 
         self._eq = self._as_sympy_eq(eq)
+        # the equation never changes, so everything derived from its symbols and string is computed only once
+        self._str = f'{self._eq.lhs} = {self._eq.rhs}'
+        self._hash = hash(self._str)
+        self._symbol_tuple: Tuple[str, ...] = tuple(sorted([str(s) for s in self._eq.free_symbols]))
+        self._symbols: FrozenSet[str] = frozenset(self._symbol_tuple)
+        self._symbol_index: Dict[str, int] = {s: i for i, s in enumerate(self._symbol_tuple)}
+        self._monomial = self._as_monomial(self._eq)
         self._ref_units = self._complete_ref_units(ref_units) if ref_units is not None else None
-        self._data: Set[Datum] = set()
+        # written values by symbol and the number of symbols without a value (see .solvable, .unknown)
+        self._values: Dict[str, Datum] = dict()
+        self._missing = len(self.symbols)
+        self._compiled = compiled
 
         self._target: Optional[Datum] = None
 
     def __str__(self):
-        return f'{self.eq.lhs} = {self.eq.rhs}'
+        return self._str
 
     def __eq__(self, other: Formula) -> bool:
         """
@@ -74,7 +228,7 @@ class Formula:
         equations, the second condition is automatically satisfied.
         """
 
-        same_eq = (self.eq == other.eq)
+        same_eq = (self._hash == other._hash and self._eq == other._eq)
 
         same_units = True
         if self._ref_units is not None and other._ref_units is not None:
@@ -83,7 +237,7 @@ class Formula:
         return all([same_eq, same_units])
 
     def __hash__(self) -> int:
-        return hash(self.eq_str)
+        return self._hash
 
     @staticmethod
     def _as_sympy_eq(expr: str, _evaluate: bool = False) -> Eq:
@@ -109,6 +263,60 @@ class Formula:
         
         return eq
 
+    @staticmethod
+    def _as_monomial(eq: Eq) -> Optional[Tuple[float, Dict[str, float]]]:
+        """
+        Classifies the equation as a monomial one, i.e. "product of powers = product of powers" (such as 'n = mps/M' or
+        'p*V = n*R*T'), with numeric coefficients and rational exponents. Such an equation is brought to the form
+        prod(x**e for each variable x) = k.
+
+        :return: tuple of (k, dict of exponents), or None if the equation is not monomial
+        """
+
+        sides = list()
+
+        for side in (eq.lhs, eq.rhs):
+            coefficient = Rational(1)
+            exponents = dict()
+
+            for base, e in side.as_powers_dict().items():
+                if base.is_Number and e.is_Number:
+                    coefficient *= base ** e
+                elif base.is_Symbol and e.is_Rational:
+                    exponents[str(base)] = e
+                else:
+                    return None
+
+            if coefficient == 0 or not coefficient.is_real:
+                return None
+
+            sides.append((coefficient, exponents))
+
+        (cl, el), (cr, er) = sides
+        exponents = {s: el.get(s, 0) - er.get(s, 0) for s in set(el) | set(er)}
+
+        if any([e == 0 for e in exponents.values()]):  # a variable that cancels out is not constrained by a monomial
+            return None
+
+        return float(cr / cl), {s: float(e) for s, e in exponents.items()}
+
+    @staticmethod
+    def as_filter(fil: str|Callable) -> Callable:
+        """
+        Returns the filter registered in Formula.FILTERS under the name "fil", or "fil" itself if it is a function.
+
+        :param fil: name of a filter (such as 'real' or 'positive') or a filter function
+        :return: filter function
+        """
+
+        if isinstance(fil, str):
+            try:
+                return Formula.FILTERS[fil]
+            except KeyError:
+                raise ValueError(f'Unknown filter "{fil}", expected one of {list(Formula.FILTERS)}.')
+
+        return fil
+
     def _complete_ref_units(self, ru: Dict[str, str|Unit]) -> Dict[str, Optional[str]]:
         """
         Adds None to variables for which user did not specify values.
@@ -166,7 +374,7 @@ class Formula:
 
         if self._ref_units is not None:
             units = Datum.normalize_units(units)
-            res = units.is_compatible_with(self._ref_units[symbol])
+            res = Datum.units_cache.is_compatible(units, self._ref_units[symbol])
 
             if raise_exception and not res:
                 raise IncompatibleUnitsError(var=symbol, units=units, ref=self._ref_units[symbol])
@@ -184,13 +392,681 @@ class Formula:
         :return:
         """
 
-        vd = dict()
+        return {s: d.base_magnitude for s, d in self._values.items()}
+
+    def _solutions(self, symbol: str) -> Optional[List[Expr]]:
+        """
+        Solves the equation for "symbol" with sympy solve(). The result is cached on the class level, so each
+        (equation, unknown) pair is solved only once. Returns None if sympy cannot solve the equation symbolically
+        (NotImplementedError) or if the equation is too costly to solve symbolically (see ._symbolic_feasible()).
+
+        :param symbol: the unknown variable
+        :return: list of the symbolic solutions or None
+        """
 
-        for d in self.data:
-            d.ito_base_units()
-            vd.update({d.symbol : d.magnitude})
+        key = (self._eq, symbol)
 
-        return vd
+        if key not in Formula._SOLUTIONS:
+            if not self._symbolic_feasible(symbol):
+                Formula._SOLUTIONS[key] = None
+                return None
+
+            try:
+                Formula._SOLUTIONS[key] = solve(self._eq, Symbol(symbol))
+            except NotImplementedError:
+                Formula._SOLUTIONS[key] = None
+
+        return Formula._SOLUTIONS[key]
+
+    def _compile(self, symbol: str) -> Optional[Tuple[Tuple[str, ...], List[Expr], Callable]]:
+        """
+        Turns the symbolic solutions for "symbol" (see ._solutions()) into a numeric function of all the other variables
+        (in alphabetical order). The solutions are lambdified with the math module, or with mpmath if math lacks some
+        of their functions (such as erfinv or LambertW). The result is cached on the class level. Returns None if there
+        are no symbolic solutions or if neither module can evaluate them.
+
+        :param symbol: the unknown variable
+        :return: tuple of (argument symbols, solutions, function returning a list of solutions) or None
+        """
+
+        key = (self._eq, symbol)
+
+        if key not in Formula._COMPILED:
+            sols = self._solutions(symbol)
+
+            if sols is None:
+                Formula._COMPILED[key] = None
+            else:
+                args = tuple(sorted(self.symbols - {symbol}))
+                func = _lambdify(args, sols, 'math')
+                if func is None:
+                    func = _lambdify(args, sols, 'mpmath')
+                Formula._COMPILED[key] = (args, sols, func) if func is not None else None
+
+        return Formula._COMPILED[key]
+
+    def _symbolic_feasible(self, symbol: str) -> bool:
+        """
+        Cheap complexity check whether it is worth asking sympy for the solutions for "symbol": equations whose
+        LHS - RHS has a numerator that is a polynomial of more than the fourth degree in the unknown have no closed-form
+        solutions in general, and sympy only returns (slow and often incomplete) implicit roots for them. Such
+        equations are left to the polynomial and numeric solvers.
+
+        :param symbol: the unknown variable
+        :return: True if the equation should be solved symbolically
+        """
+
+        x = Symbol(symbol)
+        residual = self._eq.lhs - self._eq.rhs
+
+        if residual.count(x) <= 1:
+            return True
+
+        numerator, _ = fraction(together(residual))
+        poly = numerator.as_poly(x)
+
+        return poly is None or poly.degree() <= 4
+
+    def _residual(self, symbol: str) -> Optional[Tuple[Tuple[str, ...], Callable, Callable]]:
+        """
+        Compiles the residual LHS - RHS of the equation and its derivative with respect to "symbol" into numeric
+        functions f(x, *args) and df(x, *args), where args are the other variables in alphabetical order. The
+        derivative is computed only once per (equation, unknown) pair and cached on the class level. It is taken with
+        respect to a real unknown, since only real roots are searched for (e.g. Abs(x) is differentiated to sign(x)).
+
+        :param symbol: the unknown variable
+        :return: tuple of (argument symbols, residual function, derivative function), or None if the residual cannot
+        be evaluated with the math module
+        """
+
+        key = (self._eq, symbol)
+
+        if key not in Formula._NUMERIC:
+            x = Symbol(symbol)
+            residual = self._eq.lhs - self._eq.rhs
+            args = tuple(sorted(self.symbols - {symbol}))
+            xr = Symbol(symbol, real=True)
+            f = _lambdify((symbol,) + args, residual, 'math')
+            df = _lambdify((symbol,) + args, residual.subs(x, xr).diff(xr).subs(xr, x), 'math')
+            Formula._NUMERIC[key] = (args, f, df) if f is not None and df is not None else None
+
+        return Formula._NUMERIC[key]
+
+    @staticmethod
+    def _accepts(filters: Iterable[Callable], value: float) -> bool:
+        """
+        Probes the filters with a sample value to decide whether a region of the real axis can hold solutions. Filters
+        that fail on the sample value do not restrict the region.
+        """
+
+        for fil in filters:
+            try:
+                if not fil(value):
+                    return False
+            except Exception:
+                continue
+        return True
+
+    @staticmethod
+    def _bracketed_root(f: Callable, df: Callable, lo: float, hi: float, flo: float, maxiter: int) -> Optional[float]:
+        """
+        Finds the root of "f" in the bracket [lo, hi] (f(lo) and f(hi) have opposite signs) with Newton steps that fall
+        back to bisection whenever a step would leave the bracket or does not shrink it fast enough.
+
+        :return: the root, or None if "f" or "df" cannot be evaluated inside the bracket
+        """
+
+        if flo > 0:
+            lo, hi = hi, lo
+
+        x = 0.5 * (lo + hi)
+        dx = dx_old = abs(hi - lo)
+
+        try:
+            for _ in range(maxiter):
+                fx, dfx = f(x), df(x)
+                if fx == 0:
+                    return x
+                if fx < 0:
+                    lo = x
+                else:
+                    hi = x
+
+                if dfx == 0 or ((x - hi) * dfx - fx) * ((x - lo) * dfx - fx) > 0 or abs(2 * fx) > abs(dx_old * dfx):
+                    dx_old, dx = dx, 0.5 * (hi - lo)
+                    x = lo + dx
+                else:
+                    dx_old, dx = dx, fx / dfx
+                    x = x - dx
+
+                if abs(dx) <= 4 * math.ulp(x):
+                    return x
+        except (ZeroDivisionError, ValueError, OverflowError, TypeError):
+            return None
+
+        return x
+
+    @staticmethod
+    def _extremum(df: Callable, lo: float, hi: float, dflo: float, maxiter: int) -> Optional[float]:
+        """
+        Finds the extremum of a function in [lo, hi] by bisection on its derivative "df" (df(lo) and df(hi) have
+        opposite signs).
+
+        :return: the extremum, or None if "df" cannot be evaluated inside the interval
+        """
+
+        try:
+            for _ in range(maxiter):
+                x = 0.5 * (lo + hi)
+                if x == lo or x == hi:
+                    break
+                dfx = df(x)
+                if dfx == 0:
+                    return x
+                if (dfx < 0) == (dflo < 0):
+                    lo, dflo = x, dfx
+                else:
+                    hi = x
+        except (ZeroDivisionError, ValueError, OverflowError, TypeError):
+            return None
+
+        return 0.5 * (lo + hi)
+
+    @staticmethod
+    def _numeric_points(filters: List[Callable], decades: int) -> List[float]:
+        """
+        The points of the logarithmic grid of the numeric solver spanning 10**-decades to 10**decades within the
+        regions of the real axis accepted by the filters (negative, zero, positive), in increasing order.
+        """
+
+        n = decades * Formula.NUMERIC_STEPS
+        grid = [10.0 ** (k / Formula.NUMERIC_STEPS) for k in range(-n, n + 1)]
+        points = []
+        if Formula._accepts(filters, -1.0):
+            points.extend([-x for x in reversed(grid)])
+        if Formula._accepts(filters, 0.0):
+            points.append(0.0)
+        if Formula._accepts(filters, 1.0):
+            points.extend(grid)
+
+        return points
+
+    def _numeric_eval(self, symbol: str, vd: Dict[str, float|int], filters: Iterable[Callable]) -> Optional[List[float]]:
+        """
+        Numeric solver used when sympy cannot solve the equation for "symbol". The residual is evaluated on a
+        logarithmic grid covering the regions of the real axis accepted by the filters (see ._numeric_points()), and
+        every sign change is refined by ._bracketed_root(). Between grid points where the residual keeps its sign but
+        turns towards zero, the extremum is located (see ._extremum()) and the interval is split there, so that pairs
+        of roots between two grid points are found as well. If there are no roots within NUMERIC_DECADES, the grid is
+        extended to the whole float range. Returns None if some of the other variables have no value or the residual
+        cannot be compiled (see ._residual()).
+
+        :param symbol: the unknown variable
+        :param vd: the dict of values as returned by ._value_dict()
+        :param filters: the filters passed to .eval(), used to skip regions of the real axis
+        :return: list of the real roots found
+        """
+
+        residual = self._residual(symbol)
+
+        if residual is None:
+            return None
+
+        args, f, df = residual
+
+        if not all([a in vd for a in args]):
+            return None
+
+        values = [vd[a] for a in args]
+        fx = lambda x: f(x, *values)
+        dfx = lambda x: df(x, *values)
+
+        filters = list(filters)
+
+        roots = Formula._numeric_roots(fx, dfx, Formula._numeric_points(filters, Formula.NUMERIC_DECADES))
+        if not roots:
+            roots = Formula._numeric_roots(fx, dfx, Formula._numeric_points(filters, Formula.NUMERIC_MAX_DECADES))
+
+        return roots
+
+    @staticmethod
+    def _numeric_roots(f: Callable, df: Callable, points: List[float]) -> List[float]:
+        """
+        Finds the real roots of "f" between the increasing "points" (see ._numeric_eval()).
+        """
+
+        def evaluate(func, x):
+            try:
+                return float(func(x))
+            except (ZeroDivisionError, ValueError, OverflowError, TypeError):
+                return math.nan
+
+        residuals = [evaluate(f, x) for x in points]
+        slopes = [evaluate(df, x) for x in points]
+
+        roots = []
+        brackets = []
+        for i, (x, r) in enumerate(zip(points, residuals)):
+            if r == 0:
+                roots.append(x)
+            if i + 1 == len(points) or r == 0 or residuals[i + 1] == 0:
+                continue
+
+            y, s = points[i + 1], residuals[i + 1]
+            if r * s < 0:
+                brackets.append((x, y, r))
+            elif r * s > 0 and slopes[i] * slopes[i + 1] < 0 and (slopes[i] < 0) == (r > 0):
+                # the residual turns towards zero and back: there may be two roots around the extremum
+                xm = Formula._extremum(df, x, y, slopes[i], Formula.NUMERIC_MAXITER)
+                rm = evaluate(f, xm) if xm is not None else math.nan
+                if rm == 0:
+                    roots.append(xm)
+                elif r * rm < 0:
+                    brackets.extend([(x, xm, r), (xm, y, rm)])
+
+        for lo, hi, flo in brackets:
+            root = Formula._bracketed_root(f, df, lo, hi, flo, Formula.NUMERIC_MAXITER)
+            if root is not None:
+                roots.append(root)
+
+        return roots
+
+    def _polynomial(self, symbol: str) -> Optional[Tuple[Tuple[str, ...], int, Callable]]:
+        """
+        Checks whether LHS - RHS is a polynomial of at least the second degree in "symbol" (the coefficients may depend
+        on the other variables) and compiles its coefficients into a numpy function of the other variables. The result
+        is cached on the class level.
+
+        :param symbol: the unknown variable
+        :return: tuple of (argument symbols, degree, function returning the list of coefficients from the highest
+        degree down), or None if the equation is not such a polynomial
+        """
+
+        key = (self._eq, symbol)
+
+        if key not in Formula._POLYNOMIAL:
+            poly = (self._eq.lhs - self._eq.rhs).as_poly(Symbol(symbol))
+
+            if poly is None or poly.degree() < 2:
+                Formula._POLYNOMIAL[key] = None
+            else:
+                args = tuple(sorted(self.symbols - {symbol}))
+                func = lambdify([Symbol(a) for a in args], poly.all_coeffs(), modules='numpy', dummify=True)
+                Formula._POLYNOMIAL[key] = (args, poly.degree(), func)
+
+        return Formula._POLYNOMIAL[key]
+
+    @staticmethod
+    def _polynomial_roots(coeffs: np.ndarray) -> np.ndarray:
+        """
+        Finds the roots of many polynomials at once as the eigenvalues of their companion matrices (quadratics use the
+        quadratic formula instead). Each row of
+        "coeffs" holds the coefficients of one polynomial from the highest degree down. Rows with a zero leading
+        coefficient are solved one by one with np.roots(); rows that are all zeros or not finite have no roots. Clusters
+        of roots scattered around a multiple root are merged into that root (see ._merge_multiple_roots()), the other
+        roots with a negligible imaginary part are made real and polished with one Newton step.
+
+        :param coeffs: 2D array of the shape (polynomials, degree + 1)
+        :return: complex 2D array of the shape (polynomials, degree) with the roots of each row sorted and padded with
+        NaN
+        """
+
+        n, degree = coeffs.shape[0], coeffs.shape[1] - 1
+        roots = np.full((n, degree), np.nan, dtype=complex)
+
+        finite = np.all(np.isfinite(coeffs), axis=1)
+        regular = finite & (coeffs[:, 0] != 0)
+
+        if degree == 2:
+            # the numerically stable quadratic formula is both faster and more accurate than the eigenvalues
+            a, b, c = coeffs[regular].T.astype(complex)
+            sq = np.sqrt(b * b - 4 * a * c)
+            q = -0.5 * (b + np.where((b.conjugate() * sq).real >= 0, sq, -sq))
+            with np.errstate(all='ignore'):
+                roots[regular] = np.stack([q / a, np.where(q != 0, c / q, 0.0)], axis=-1)
+        else:
+            companion = np.zeros((np.count_nonzero(regular), degree, degree))
+            companion[:, 0, :] = -coeffs[regular, 1:] / coeffs[regular, :1]
+            companion[:, np.arange(1, degree), np.arange(degree - 1)] = 1.0
+            roots[regular] = np.linalg.eigvals(companion)
+
+        for i in np.flatnonzero(finite & ~regular & np.any(coeffs != 0, axis=1)):
+            r = np.roots(coeffs[i])
+            roots[i, :len(r)] = r
+
+        merged = np.zeros(roots.shape, dtype=bool)
+        if degree > 1:
+            # only the rows with roots close enough to form a cluster are examined one by one
+            with np.errstate(invalid='ignore'):
+                distance = np.abs(roots[:, :, None] - roots[:, None, :])
+                distance[:, np.arange(degree), np.arange(degree)] = np.inf
+                close = distance <= Formula._cluster_tol(degree) * np.abs(roots)[:, :, None]
+
+            for i in np.flatnonzero(np.any(close, axis=(1, 2))):
+                roots[i], merged[i] = Formula._merge_multiple_roots(coeffs[i], roots[i])
+
+        real = np.abs(roots.imag) <= Formula.POLYNOMIAL_IMAG_TOL * np.abs(roots)
+        x = np.where(real, roots.real, 0.0)
+
+        p, dp = np.zeros(x.shape), np.zeros(x.shape)
+        for c in coeffs.T:
+            dp = dp * x + p
+            p = p * x + c[:, None]
+
+        with np.errstate(all='ignore'):
+            polished = x - p / dp
+            q = np.zeros(x.shape)
+            for c in coeffs.T:
+                q = q * polished + c[:, None]
+            better = np.isfinite(polished) & (np.abs(q) < np.abs(p)) & ~merged
+
+        roots = np.where(real, np.where(better, polished, x), roots)
+        return np.sort(roots, axis=1)
+
+    @staticmethod
+    def _cluster_tol(m: int) -> float:
+        """The relative scatter of the computed roots of a root of multiplicity "m" (see POLYNOMIAL_CLUSTER_TOL)."""
+        return Formula.POLYNOMIAL_CLUSTER_TOL * np.finfo(float).eps ** (1 / m)
+
+    @staticmethod
+    def _merge_multiple_roots(c: np.ndarray, roots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Merges the clusters of roots of the polynomial "c" that scatter around a multiple root. Neighbouring roots (in
+        the order of their real parts) form a cluster of m roots if all of them lie within ._cluster_tol(m) of the
+        mean of the cluster; the largest such cluster is taken. The mean is refined by Newton steps on the (m-1)-th
+        derivative of the polynomial, for which the multiple root is a simple root, and replaces all the roots of the
+        cluster.
+
+        :param c: coefficients of the polynomial from the highest degree down
+        :param roots: the roots of the polynomial, NaN for missing roots
+        :return: tuple of (roots with the clusters merged, boolean mask of the merged roots)
+        """
+
+        roots = roots.copy()
+        merged = np.zeros(roots.shape, dtype=bool)
+
+        order = [j for j in np.argsort(roots.real) if not np.isnan(roots[j])]
+        clusters = list()
+
+        start = 0
+        while start < len(order):
+            # the scatter grows with the multiplicity, so a smaller part of a cluster may not fit its tolerance
+            for m in range(len(order) - start, 0, -1):
+                cluster = order[start:start + m]
+                mean = np.mean(roots[cluster])
+                if m == 1 or np.all(np.abs(roots[cluster] - mean) <= Formula._cluster_tol(m) * np.abs(mean)):
+                    break
+            clusters.append(cluster)
+            start += m
+
+        for cluster in clusters:
+            m = len(cluster)
+            if m == 1:
+                continue
+
+            mean = np.mean(roots[cluster])
+            tol = Formula._cluster_tol(m) * np.abs(mean)
+            x = complex(mean.real) if abs(mean.imag) <= tol else complex(mean)
+
+            g = np.polyder(c, m - 1)
+            dg = np.polyder(g)
+            with np.errstate(all='ignore'):
+                for _ in range(3):
+                    step = np.polyval(g, x) / np.polyval(dg, x)
+                    if not np.isfinite(step) or step == 0:
+                        break
+                    x -= step
+
+            if not np.isfinite(x) or abs(x - mean) > tol:
+                x = mean
+
+            roots[cluster] = x
+            merged[cluster] = True
+
+        return roots, merged
+
+    def _polynomial_eval(self, symbol: str, vd: Dict[str, float|int]) -> Optional[List[float|complex]]:
+        """
+        Fast path for equations polynomial in "symbol" (see ._polynomial()): the coefficients are evaluated with the
+        base-unit magnitudes from "vd" and the roots are found numerically (see ._polynomial_roots()). Returns None if
+        the fast path does not apply (not a polynomial, missing values, coefficients that are all zero or not finite).
+
+        :param symbol: the unknown variable
+        :param vd: the dict of values as returned by ._value_dict()
+        :return: list of the roots, real roots as float and the others as complex
+        """
+
+        polynomial = self._polynomial(symbol)
+
+        if polynomial is None:
+            return None
+
+        args, _, func = polynomial
+
+        if not all([a in vd for a in args]):
+            return None
+
+        with np.errstate(all='ignore'):
+            coeffs = np.array([func(*[vd[a] for a in args])], dtype=float)
+
+        if not np.all(np.isfinite(coeffs)) or not np.any(coeffs):
+            return None
+
+        roots = Formula._polynomial_roots(coeffs)[0]
+        return [float(r.real) if r.imag == 0 else complex(r) for r in roots if not np.isnan(r)]
+
+    def _monomial_eval(self, symbol: str, vd: Dict[str, float|int]) -> Optional[List[float]]:
+        """
+        Fast path for monomial equations (see ._as_monomial()) where "symbol" has the exponent 1 or -1: the unknown is
+        isolated by exponent arithmetic on the base-unit magnitudes, without sympy. Returns None if the fast path does
+        not apply (other exponents, missing values, zeros, or negative values under fractional powers).
+
+        :param symbol: the unknown variable
+        :param vd: the dict of values as returned by ._value_dict()
+        :return: list with the only solution or None
+        """
+
+        if self._monomial is None:
+            return None
+
+        k, exponents = self._monomial
+        e = exponents[symbol]
+
+        if abs(e) != 1.0:
+            return None
+
+        r = k
+        try:
+            for s, es in exponents.items():
+                if s == symbol:
+                    continue
+
+                v = vd[s]
+                if v < 0 and not es.is_integer():
+                    return None
+
+                r /= v ** es
+        except (KeyError, ZeroDivisionError, OverflowError):
+            return None
+
+        if e == 1.0:
+            return [r]
+        elif r != 0:
+            return [1.0 / r]
+        else:
+            return None
+
+    def _compiled_eval(self, symbol: str, vd: Dict[str, float|int]) -> Optional[List[float|complex]]:
+        """
+        Evaluates the compiled solutions for "symbol" with the base-unit magnitudes from "vd". Returns None if the
+        compiled solutions cannot be used (no closed form, missing values, or a numeric error such as division by zero
+        or a negative number under a root), in which case the caller must fall back to sympy solve().
+
+        :param symbol: the unknown variable
+        :param vd: the dict of values as returned by ._value_dict()
+        :return: list of numeric solutions or None
+        """
+
+        compiled = self._compile(symbol)
+
+        if compiled is None:
+            return None
+
+        args, _, func = compiled
+
+        if not all([a in vd for a in args]):
+            return None
+
+        try:
+            sols = func(*[vd[a] for a in args])
+        except (ZeroDivisionError, ValueError, OverflowError, TypeError):
+            return None
+
+        sols = [complex(s) for s in sols]  # mpmath returns mpf and mpc
+        sols = [s.real if s.imag == 0 else s for s in sols]
+        return [s for s in sols if self._is_root(symbol, vd, s)]
+
+    def _is_root(self, symbol: str, vd: Dict[str, float|int], root: float|complex) -> bool:
+        """
+        Checks that "root" solves the equation for "symbol" with the base-unit magnitudes from "vd" (see
+        ROOT_REL_TOL). Complex roots and the equations that cannot be lambdified are checked by substitution.
+        """
+
+        func = self._sides()
+
+        def sides(x: float|complex) -> Tuple[float|complex, float|complex]:
+            values = [x if s == symbol else vd[s] for s in self._symbol_tuple]
+            if func is not None and not isinstance(x, complex):
+                return func(*values)
+            subs = dict(zip(self._symbol_tuple, values))
+            return complex(self._eq.lhs.subs(subs)), complex(self._eq.rhs.subs(subs))
+
+        try:
+            lhs, rhs = sides(root)
+            lhs_s, rhs_s = sides(root * (1 + Formula.ROOT_REL_TOL))
+        except (ArithmeticError, ValueError, TypeError):
+            return False
+
+        return bool(Formula._root_mask(lhs - rhs, lhs_s - rhs_s, Formula._isclose(lhs, rhs)))
+
+    @staticmethod
+    def _root_mask(d: np.ndarray, d_shifted: np.ndarray, close: np.ndarray) -> np.ndarray:
+        """Vectorized counterpart of the check in ._is_root() for the residuals "d" at the roots and "d_shifted" at
+        the shifted roots; "close" marks the roots whose sides are close."""
+        with np.errstate(invalid='ignore'):
+            return close | (np.abs(d) <= np.abs(d_shifted - d))
+
+    def _linear_form(self, unknowns: Iterable[str]) -> Optional[Tuple[Tuple[str, ...], Callable]]:
+        """
+        Checks whether the equation is linear in the "unknowns" (the coefficients may depend on the other variables)
+        and compiles its linear form LHS - RHS = sum(coefficient * unknown) + constant. The result is cached on the
+        class level.
+
+        :param unknowns: the variables the equation must be linear in
+        :return: tuple of (argument symbols, function returning the list of coefficients in the order of the sorted
+        unknowns followed by the constant), or None if the equation is not linear in the unknowns
+        """
+
+        unknowns = frozenset(unknowns)
+        key = (self._eq, unknowns)
+
+        if key not in Formula._LINEAR:
+            residual = self._eq.lhs - self._eq.rhs
+            syms = [Symbol(u) for u in sorted(unknowns)]
+            coefficients = [residual.diff(u) for u in syms]
+
+            if any([c.has(*syms) for c in coefficients]):
+                Formula._LINEAR[key] = None
+            else:
+                constant = residual.subs({u: 0 for u in syms})
+                args = tuple(sorted(self.symbols - unknowns))
+                func = _lambdify(args, coefficients + [constant], 'math')
+                Formula._LINEAR[key] = (args, func) if func is not None else None
+
+        return Formula._LINEAR[key]
+
+    def _vectorized(self, symbol: str) -> Optional[Tuple[Tuple[str, ...], Callable]]:
+        """
+        Returns the compiled solutions for "symbol" (see ._compile()) lambdified with numpy so that they can be
+        evaluated element-wise over arrays. Returns None if there is no closed-form solution.
+        """
+
+        compiled = self._compile(symbol)
+
+        if compiled is None:
+            return None
+
+        args, sols, _ = compiled
+        key = (self._eq, symbol)
+
+        if key not in Formula._VECTORIZED:
+            Formula._VECTORIZED[key] = _lambdify(args, sols, 'numpy')
+
+        if Formula._VECTORIZED[key] is None:
+            return None
+
+        return args, Formula._VECTORIZED[key]
+
+    def _sides(self, vectorized: bool = False) -> Optional[Callable]:
+        """
+        Returns the function of the base-unit magnitudes of all the symbols (in .symbol_tuple order) that evaluates
+        both sides of the equation. With "vectorized" set to True, the function is lambdified with numpy and evaluates
+        the sides element-wise over arrays. Returns None if the equation uses functions that the module lacks (see
+        _lambdify()).
+        """
+
+        key = (self._eq, vectorized)
+
+        if key not in Formula._SIDES:
+            Formula._SIDES[key] = _lambdify(
+                self._symbol_tuple,
+                [self._eq.lhs, self._eq.rhs],
+                'numpy' if vectorized else 'math'
+            )
+
+        return Formula._SIDES[key]
+
+    def _sides_subs(self, *values: float) -> Tuple[float, float]:
+        """Evaluates both sides of the equation by substitution of the base-unit magnitudes of all the symbols (in
+        .symbol_tuple order). The sides that are not real numbers are NaN."""
+
+        vd = dict(zip(self._symbol_tuple, values))
+        res = list()
+
+        for side in (self._eq.lhs, self._eq.rhs):
+            try:
+                c = complex(side.subs(vd))
+            except TypeError:  # e.g. zoo or nan
+                c = complex(math.nan)
+            res.append(c.real if c.imag == 0 else math.nan)
+
+        return res[0], res[1]
+
+    def _sides_batch(self, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Evaluates both sides of the equation for arrays of base-unit magnitudes of all the symbols. The results
+        are broadcast to the common shape of the arrays; the rows that cannot be evaluated are NaN."""
+
+        arrays = np.broadcast_arrays(*[np.asarray(values[s], dtype=float) for s in self._symbol_tuple])
+
+        func = self._sides(vectorized=True)
+        if func is None:
+            func = np.vectorize(self._sides_subs, otypes=[float, float])
+
+        with np.errstate(all='ignore'):
+            lhs, rhs = func(*arrays)
+
+        shape = arrays[0].shape if arrays else ()
+        return tuple([np.broadcast_to(np.asarray(side, dtype=float), shape) for side in (lhs, rhs)])
+
+    @staticmethod
+    def _isclose(lhs: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+        """Element-wise math.isclose() with the consistency tolerances: NaN is not close to anything, and an infinity
+        is only close to itself."""
+
+        with np.errstate(invalid='ignore'):
+            tol = np.maximum(Formula.CONSISTENCY_REL_TOL * np.maximum(np.abs(lhs), np.abs(rhs)), Formula.CONSISTENCY_ABS_TOL)
+            finite = np.isfinite(lhs) & np.isfinite(rhs)
+            return (lhs == rhs) | (finite & (np.abs(lhs - rhs) <= tol))
 
     # ============================================================================================== WRITING AND READING
     def write(
@@ -200,7 +1076,7 @@ class Formula:
             force_inconsistent: bool = False
     ) -> None:
         """
-        Adds the values specified in "d" parameter to the _data attribute. Also checks for
+        Adds the values specified in "d" parameter to the written values. Also checks for
         - consistency after the value is written
         - compatibility of units
         - presence of the variable in the formula
@@ -230,7 +1106,8 @@ class Formula:
                         details='To enable rewriting set the "rewrite" parameter to True.'
                     )
 
-            self._data.add(datum)
+            self._values[datum.symbol] = datum
+            self._missing -= 1
             if not self.consistency_check(silent_failure=True, raise_exception=False) and not force_inconsistent:
                 raise ConsistencyError(formula=self.eq_str, details=f'The last value to write was "{str(datum)}".')
 
@@ -260,9 +1137,8 @@ class Formula:
         if isinstance(var, str):
             self._confirm_symbol(var)
 
-            if self.has_value(var):
-                ds = filter(lambda a: a.symbol == var, self._data)
-                ds = copy(list(ds)[0])
+            if var in self._values:
+                ds = copy(self._values[var])
 
                 if units is not None:
                     self._confirm_units(var, units)
@@ -291,12 +1167,17 @@ class Formula:
 
     def erase(self, var: Optional[str] = None) -> None:
         if var is not None:
-            d = self.read(var)  # variable is confirmed here
-            self._data.remove(d)
+            self.read(var)  # variable is confirmed here
+            del self._values[var]
+            self._missing += 1
         else:
             for s in self.symbols:
                 self.erase(s)
 
+    def copy(self) -> Formula:
+        """Returns an independent copy with copies of the written Datum instances and the target"""
+        return deepcopy(self)
+
     # ================================================================================================= FORMULA ANALYSIS
     def consistency_check(
             self,
@@ -323,15 +1204,23 @@ class Formula:
 
         from math import isclose
 
-        if all([self.has_value(v) for v in self.symbols]):
+        if self._missing == 0:
             vd = self._value_dict()
+            sides = None
+
+            func = self._sides() if self._compiled else None
+
+            if func is not None:
+                try:
+                    sides = func(*[vd[s] for s in self._symbol_tuple])
+                except (ArithmeticError, ValueError, TypeError):  # e.g. division by zero, complex or array values
+                    pass
 
-            lhs = self.eq.lhs.subs(vd)
-            rhs = self.eq.rhs.subs(vd)
+            if sides is None:
+                sides = (self._eq.lhs.subs(vd), self._eq.rhs.subs(vd))
 
-            close = isclose(rhs, lhs, rel_tol=1e-12, abs_tol=1e-15)
-            # 15 digits are the last digit not affected by operations with float in Python (abs_tol).
-            # one of the sides is always zero due to the standard way of writing equations in Formula.
+            lhs, rhs = sides
+            close = isclose(rhs, lhs, rel_tol=Formula.CONSISTENCY_REL_TOL, abs_tol=Formula.CONSISTENCY_ABS_TOL)
 
             if not close and raise_exception:
                 raise ConsistencyError(formula=self.eq_str)
@@ -344,6 +1233,30 @@ class Formula:
         else:
             raise FailedConsistencyCheck(formula=self.eq_str, details='Not all variables have values.')
 
+    def consistency_batch(self, columns: Dict[str, Tuple[Iterable[float|int], str|Unit]]) -> np.ndarray:
+        """
+        Vectorized counterpart of .consistency_check(). Checks many rows of values at once without creating Datum
+        instances; the columns are given as in .solve_batch() and must contain all the variables. The written values of
+        the Formula are not used.
+
+        :param columns: dict of the form {symbol: (magnitudes, units)}
+        :return: boolean array with True for each row of "columns" where the formula is consistent
+        """
+
+        for s, (_, u) in columns.items():
+            self._confirm_symbol(s)
+            self._confirm_units(s, u)
+
+        missing = self.symbols - set(columns)
+        if missing:
+            raise FailedConsistencyCheck(formula=self.eq_str, details=f'No values for {sorted(missing)}.')
+
+        values = dict()
+        for s, (mags, u) in columns.items():
+            values[s] = Datum.units_cache.to_base(np.atleast_1d(np.asarray(mags, dtype=float)), u)
+
+        return Formula._isclose(*self._sides_batch(values))
+
 
     @overload
     def has_value(self, var: str) -> bool:
@@ -355,8 +1268,7 @@ class Formula:
 
     def has_value(self, var: str | Iterable[str]) -> bool | List[bool]:
         """
-        Checks that the specified variable(s) has a value. Raises OverlappingVariables exception if there is more than
-        one variable with the same symbol.
+        Checks that the specified variable(s) has a value.
 
         :param var: variables to be checked
         :return:
@@ -364,17 +1276,7 @@ class Formula:
 
         if isinstance(var, str):
             self._confirm_symbol(var)
-            ds = list(filter(lambda a: a.symbol == var, self._data))
-
-            if len(ds) > 1:
-                raise OverlappingVariables(
-                    formula=self.eq_str,
-                    vars=[d.symbol for d in ds],
-                    details='This error could only occur if you directly changed the protected attribute ._data. '
-                            'If this is not so, you have discovered a bug. Congratulations!'
-                )
-            else:
-                return len(ds) > 0
+            return var in self._values
 
         elif isinstance(var, (list, tuple, set)):
             res_list = list()
@@ -398,8 +1300,17 @@ class Formula:
         variables have a value, sp.Float is returned.
 
         The "filters" parameters specify which solutions to keep and which to ignore. On a class level several pre-set
-        filters are defined (such as REAL_ONLY, POSITIVES, ...). Each filter is passed to the standard Python's filter()
-        function to filter the obtained solutions.
+        filters are defined (such as REAL_ONLY, POSITIVES, ...), registered in Formula.FILTERS so that they can also be
+        given by name ('real', 'positive', ...). The pre-set filters classify numeric solutions with plain float
+        comparisons within the tolerances Formula.IMAG_TOL and Formula.ZERO_TOL; the sign filters also discard complex
+        solutions. Each filter is passed to the standard Python's filter() function to filter the obtained solutions.
+
+        In the compiled mode (see __init__) the numeric solutions are computed from the cached closed-form solutions
+        without calling sympy solve(), unless the compiled solutions cannot be used for the current values. Monomial
+        equations (products of powers) are solved by exponent arithmetic directly, and polynomials of the second or
+        higher degree in the target by a companion-matrix root finder. Equations that sympy cannot solve symbolically,
+        or too costly to solve symbolically (polynomials of high degree), are solved numerically for the real roots
+        within the regions of the real axis allowed by the filters.
 
         Example
         ----------
@@ -417,7 +1328,8 @@ class Formula:
             [-3, -2]
 
 
-        :param filters: function to be passed to the filter() Python function to sort solutions from sympy solve
+        :param filters: function (or name of a filter from Formula.FILTERS) to be passed to the filter() Python function
+        to sort solutions from sympy solve
         :param symbolic: if True, the function returns an Equality instance without substituting variable values
         :return: list of either sympy Equality or sympy Float (if the solution can be found)
         """
@@ -425,6 +1337,8 @@ class Formula:
         if self.target is None:
             raise TargetNotFound(formula=self.eq_str)
 
+        filters = [Formula.as_filter(fil) for fil in filters]
+
         self.consistency_check(silent_failure=True)
         self._confirm_symbol(self.target.symbol)
         self._confirm_units(self.target.units)
@@ -435,13 +1349,25 @@ class Formula:
             if self.has_value(self.target.symbol):
                 tbu = self.read(self.target.symbol, self.target.base_units)
                 return {Float(tbu.magnitude)}
-            else:
-                eq = self.eq.subs(vd)
+
+            sols = None
+            if self._compiled:
+                sols = self._monomial_eval(self.target.symbol, vd)
+                if sols is None:
+                    sols = self._polynomial_eval(self.target.symbol, vd)
+                if sols is None:
+                    sols = self._compiled_eval(self.target.symbol, vd)
+
+            if sols is None and self._compiled and self._solutions(self.target.symbol) is None:
+                sols = self._numeric_eval(self.target.symbol, vd, filters)
+
+            if sols is None:
+                sols = solve(self.eq.subs(vd), self.target.symbol)
         else:
-            eq = self.eq
+            compiled = self._solutions(self.target.symbol) if self._compiled else None
+            sols = compiled if compiled is not None else solve(self.eq, self.target.symbol)
 
-        sols = solve(eq, self.target.symbol)
-        native_sols = set([float(s) if isinstance(s, Number) else s for s in sols])
+        native_sols = set([float(s) if isinstance(s, Real) else s for s in sols])
 
         if symbolic:
             res = set()
@@ -506,14 +1432,14 @@ class Formula:
         res = set()
 
         for sol in sols:
-            sol = float(sol)  # from smypy Float to Python's native float
+            sol = complex(sol).real  # from smypy Float (or a complex number with a negligible imaginary part)
 
-            d = Datum(self.target.symbol, sol, self.target.base_units)
+            d = Datum._trusted(self.target.symbol, sol, self.target.base_units)
             d.ito(self.target.units)
 
             if rounding:
                 mag = round(d.magnitude, Datum.get_decimals(self.target.magnitude))
-                d = Datum(self.target.symbol, mag, self.target.units)
+                d = Datum._trusted(self.target.symbol, mag, self.target.units)
 
             res.add(d)
 
@@ -522,6 +1448,111 @@ class Formula:
 
         return res
 
+    def solve_batch(
+            self,
+            columns: Dict[str, Tuple[Iterable[float|int], str|Unit]],
+            *filters,
+            target: Optional[Datum|str] = None
+    ) -> np.ndarray:
+        """
+        Vectorized counterpart of .solve(). Solves the formula for many rows of values at once without creating Datum
+        instances. Each known variable is given as a column: an array of magnitudes and the units of the whole column.
+        The written values of the Formula are not used.
+
+        The unknown is the symbol of the "target" (its units and magnitude work as in .solve(), but no rounding is
+        done). If "target" is None, the unknown is the only variable missing from "columns", and the result is given in
+        its reference units.
+
+        Equations polynomial in the unknown are solved with the companion-matrix root finder for all rows at once, and
+        their solutions are sorted in each row.
+
+        Complex solutions are always discarded (as with Formula.REAL_ONLY in .solve()). The "filters" are applied
+        element-wise to the arrays of real solutions, so the class-level filters (POSITIVES, NEGATIVES, ...) can be
+        used as they are.
+
+        Example
+        ----------
+            >>> from QCalculator import Formula
+            >>> f = Formula('y = x**2 + 5*x - 6')
+            >>> f.solve_batch({'y': ([0, 8], '')}, Formula.POSITIVES, target='x = 0.1')
+            array([[nan,  1.],
+                   [nan,  2.]])
+
+        :param columns: dict of the form {symbol: (magnitudes, units)}
+        :param filters: functions returning a boolean array for an array of solutions
+        :param target: Datum or Datum definition string specifying the unknown and the units of the result
+        :return: 2D array with a row for each row of "columns" and a column for each solution of the equation. The
+        solutions that are complex or filtered out are NaN.
+        """
+
+        for s, (_, u) in columns.items():
+            self._confirm_symbol(s)
+            self._confirm_units(s, u)
+
+        if target is not None:
+            target = Datum.as_datum(target)
+            self._confirm_symbol(target.symbol)
+            self._confirm_units(target.symbol, target.units)
+
+            unk = target.symbol
+            units = target.units
+            missing = self.symbols - set(columns)
+
+            if unk not in missing:
+                raise UnknownNotFound(formula=self.eq_str, details=f'The target "{unk}" is given as a column.')
+            elif len(missing) > 1:
+                raise EquationNotSolvable(formula=self.eq_str, details=f'No values for {sorted(missing - {unk})}.')
+        else:
+            missing = self.symbols - set(columns)
+
+            if not missing:
+                raise UnknownNotFound(formula=self.eq_str)
+            elif len(missing) > 1:
+                raise EquationNotSolvable(formula=self.eq_str, details=f'No values for {sorted(missing)}.')
+            elif self._ref_units is None:
+                raise Exception('Specify either target or reference units to solve equations without specifying target variable.')
+
+            (unk,) = missing
+            units = Datum.normalize_units(self._ref_units[unk])
+
+        polynomial = self._polynomial(unk)
+        if polynomial is not None:
+            args, _, func = polynomial
+        else:
+            vectorized = self._vectorized(unk)
+            if vectorized is None:
+                raise EquationNotSolvable(formula=self.eq_str, details=f'There is no closed-form solution for "{unk}".')
+            args, func = vectorized
+
+        base_columns = dict()
+        for s, (mags, u) in columns.items():
+            base_columns[s] = Datum.units_cache.to_base(np.atleast_1d(np.asarray(mags, dtype=float)), u)
+
+        dtype = float if polynomial is not None else complex
+        values = np.broadcast_arrays(*[np.asarray(base_columns[a], dtype=dtype) for a in args])
+
+        with np.errstate(all='ignore'):
+            sols = func(*values)
+            n = len(values[0]) if values else 1
+            sols = np.stack([np.broadcast_to(np.asarray(sol, dtype=dtype), (n,)) for sol in sols], axis=-1)
+
+            if polynomial is not None:
+                sols = Formula._polynomial_roots(sols)
+
+            res = np.where(Formula.REAL_ONLY(sols), sols.real, np.nan)
+
+            if polynomial is None:  # the general closed-form solutions may not hold for all the rows
+                for j in range(res.shape[1]):
+                    lhs, rhs = self._sides_batch({**base_columns, unk: res[:, j]})
+                    lhs_s, rhs_s = self._sides_batch({**base_columns, unk: res[:, j] * (1 + Formula.ROOT_REL_TOL)})
+                    roots = Formula._root_mask(lhs - rhs, lhs_s - rhs_s, Formula._isclose(lhs, rhs))
+                    res[:, j] = np.where(roots, res[:, j], np.nan)
+
+            for fil in filters:
+                res = np.where(np.asarray(Formula.as_filter(fil)(res), dtype=bool), res, np.nan)
+
+        return Datum.units_cache.convert(res, Datum.units_cache.base_units(units), units)
+
     # ======================================================================================================= PROPERTIES
     @property
     def decimals(self) -> Dict[str, int]:
@@ -531,15 +1562,7 @@ class Formula:
         :return:
         """
 
-        decs = dict()
-
-        for symbol in self.symbols:
-            if self.has_value(symbol):
-                d = self.read(symbol)
-                dec = d.get_decimals(d.magnitude)
-                decs[symbol] = dec
-
-        return decs
+        return {s: d.get_decimals(d.magnitude) for s, d in self._values.items()}
 
     @property
     def solvable(self) -> bool:
@@ -549,14 +1572,12 @@ class Formula:
         :return:
         """
 
-        values = self.has_value(list(self.symbols))
-        nones = [v for v in values if v is False]  # count Falses. If there's one value missing, the equation can be solved
-        return len(nones) <= 1
+        return self._missing <= 1  # if there's one value missing, the equation can be solved
 
     @property
     def all_values(self) -> bool:
         """returns True if all values are already present in the Formula"""
-        return len(self._data) == len(self.symbols)  # because we control for each var having no more than one value
+        return self._missing == 0
 
     @property
     def unknown(self) -> str:
@@ -568,27 +1589,60 @@ class Formula:
         :return:
         """
 
-        if self.solvable:
-            for s in self.symbols:
-                if not self.has_value(s):
-                    return s
-            else:
-                raise UnknownNotFound(formula=self.eq_str)
+        if self._missing == 1:
+            return next(s for s in self.symbols if s not in self._values)
+        elif self._missing == 0:
+            raise UnknownNotFound(formula=self.eq_str)
         else:
             raise EquationNotSolvable(formula=self.eq_str)
 
     @property
-    def data(self) -> Set[Datum]:
-        """Returns a **deepcopy** of the data set where the written Datum instances are stored"""
-        return deepcopy(self._data)
+    def data(self) -> FrozenSet[Datum]:
+        """
+        Returns a read-only set of the written Datum instances. Only the set is read-only: the Datums are the live
+        instances (not copies, to keep the access cheap), so changing them in place (e.g. with Datum.ito()) changes the
+        written values. Use .copy() for independent instances.
+        """
+        return frozenset(self._values.values())
+
+    @property
+    def _data(self) -> Set[Datum]:
+        """The set of written Datum instances. The whole set can be replaced at once by assignment."""
+        return set(self._values.values())
+
+    @_data.setter
+    def _data(self, data: Iterable[Datum]) -> None:
+        values = dict()
+
+        for d in data:
+            if d.symbol in values:
+                raise OverlappingVariables(
+                    formula=self.eq_str,
+                    vars=[d.symbol],
+                    details='Only one value can be written for each variable.'
+                )
+            values[d.symbol] = d
+
+        self._values = values
+        self._missing = sum([s not in values for s in self.symbols])
+
+    @property
+    def symbols(self) -> FrozenSet[str]:
+        return self._symbols
+
+    @property
+    def symbol_tuple(self) -> Tuple[str, ...]:
+        """Returns the symbols of the equation in sorted order"""
+        return self._symbol_tuple
 
     @property
-    def symbols(self) -> Set[str]:
-        return set([str(s) for s in self._eq.free_symbols])
+    def symbol_index(self) -> Mapping[str, int]:
+        """Returns a read-only mapping of each symbol to its position in .symbol_tuple"""
+        return MappingProxyType(self._symbol_index)
 
     @property
     def eq_str(self) -> str:
-        return str(self)
+        return self._str
 
     @property
     def eq(self) -> Eq:
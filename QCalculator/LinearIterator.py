@@ -1,5 +1,9 @@
+from __future__ import annotations
+
 from QCalculator import Formula, Datum
+from QCalculator.Formula import _lambdify
 from QCalculator.Exceptions.DatumExceptions import InvalidSymbol
+from QCalculator.Exceptions.FormulaExceptions import EquationNotSolvable, ConsistencyError
 from QCalculator.Exceptions.LinearIteratorExceptions import (
     NoValueError,
     UnusedSymbolError,
@@ -9,30 +13,104 @@ from QCalculator.Exceptions.LinearIteratorExceptions import (
     UnreachableTarget
 )
 
-from typing import List, Dict, Tuple, Optional, Set, overload
+from typing import List, Dict, Tuple, Optional, Set, FrozenSet, Iterable, NamedTuple, Callable, overload
 from pint import Unit
+from sympy import Eq, Symbol, solve, lambdify
 from copy import copy, deepcopy
+from itertools import groupby
+from operator import attrgetter
+
+import numpy as np
+
+
+class PlanStep(NamedTuple):
+    """One step of a derivation plan: "formula" is solved for "symbol" during the pass number "stage"."""
+    stage: int
+    formula: Formula
+    symbol: str
+
+
+class BlockStep(NamedTuple):
+    """A step of a derivation plan where the coupled "formulas" are solved jointly for "symbols"."""
+    stage: int
+    formulas: Tuple[Formula, ...]
+    symbols: Tuple[str, ...]
+
+
+class LinearSolution(NamedTuple):
+    """The result of LinearIterator.solve_linear(): the found values and the variables that are not determined."""
+    determined: Set[Datum]
+    underdetermined: Set[str]
+
+
+class Verification(NamedTuple):
+    """
+    The result of LinearIterator.verify(): the worst relative residual of each Formula, the worst relative residual of
+    each scenario (None unless a table is verified) and the Formulas that are not consistent.
+    """
+    formulas: Dict[Formula, float]
+    scenarios: Optional[np.ndarray]
+    inconsistent: Set[Formula]
 
 
 class LinearIterator:
+    BLOCK_SIZE: int = 3  # the largest number of coupled Formulas solved jointly
+    # the rows of the linear systems of .solve_linear() and .solve_monomial() with a residual above LINEAR_REL_TOL
+    # times the magnitude of their terms are contradicting
+    LINEAR_REL_TOL: float = 1e-9
+
+    # joint solutions of coupled blocks: (equations, unknowns) -> (arguments, function) or None if not solvable
+    _BLOCKS: Dict[Tuple[Tuple[Eq, ...], Tuple[str, ...]], Optional[Tuple[Tuple[str, ...], Callable]]] = dict()
+    # both sides of all the equations of a system for .verify(): equations -> (arguments, function returning the
+    # list [LHS, RHS, LHS, RHS, ...] in the order of the equations)
+    _SIDES: Dict[Tuple[Eq, ...], Tuple[Tuple[str, ...], Callable]] = dict()
+
     def __init__(self, formulas: List[str], ref_units: Optional[Dict[str, str]] = None) -> None:
         self._formulas = self._normalize_formulas(formulas, ref_units)
+        self._index = self._index_symbols(self._formulas)
+        self._unknowns: Dict[Formula, int] = {f: len(f.symbols) for f in self._formulas}
+        self._ready: Set[Formula] = {f for f, n in self._unknowns.items() if n == 1}
         self._ref_units = self._select_units() if ref_units is not None else None
-        self._data = set()
+        self._plans: Dict[FrozenSet[str], Tuple[PlanStep|BlockStep, ...]] = dict()
+        self._values: Dict[str, Datum] = dict()  # written values by symbol
         self._target = None
 
     # ================================================================================================== PRIVATE HELPERS
     def _select_units(self) -> Dict[str, Optional[str]]:
         present_units = dict()
 
-        for s in self.symbols:
-            for f in self.formulas:
-                if s not in present_units and s in f.symbols:
-                    u = f._ref_units[s]
-                    present_units[s] = u
+        for s, fs in self._index.items():
+            f = next(iter(fs))
+            present_units[s] = f._ref_units[s]
 
         return present_units
 
+    @staticmethod
+    def _index_symbols(formulas: Set[Formula]) -> Dict[str, Set[Formula]]:
+        """Returns the inverted index of the system: each symbol is mapped to the set of Formulas that contain it."""
+        index = dict()
+
+        for f in formulas:
+            for s in f.symbols:
+                index.setdefault(s, set()).add(f)
+
+        return index
+
+    def _count_unknowns(self, f: Formula) -> None:
+        """
+        Takes over the number of variables without a value from the Formula "f" and keeps the set of ready Formulas
+        (exactly one unknown) in sync with it. The Formula keeps its count even when a write fails half-way (a value
+        that fails the consistency check is stored before ConsistencyError is raised).
+        """
+
+        n = f._missing
+        self._unknowns[f] = n
+
+        if n == 1:
+            self._ready.add(f)
+        else:
+            self._ready.discard(f)
+
     @staticmethod
     def _normalize_formulas(f: List[str], u: Dict[str, str]) -> Set[Formula]:
         fs = set()
@@ -50,24 +128,239 @@ class LinearIterator:
 
         return fs
 
+    def _make_plan(self, known: FrozenSet[str]) -> Tuple[PlanStep|BlockStep, ...]:
+        """
+        Propagates the known symbols through the symbol index without solving anything. At each stage every Formula
+        with exactly one unknown is planned to produce that unknown. A Formula whose unknown is already planned by
+        another Formula at the same stage is skipped (it is only checked for consistency once the value is written).
+        When no Formula has exactly one unknown, the coupled blocks (see ._find_blocks()) are planned at that stage.
+        Blocks are planned only with reference units, which give the units of the jointly solved variables.
+        """
+
+        unknowns = {f: len(f.symbols) for f in self._formulas}
+        for s in known:
+            for f in self._index[s]:
+                unknowns[f] -= 1
+
+        planned = set(known)
+        ready = [f for f, n in unknowns.items() if n == 1]
+        steps = list()
+        stage = 0
+
+        while True:
+            next_ready = list()
+
+            if ready:
+                for f in sorted(ready, key=str):  # sorted to make the plans reproducible
+                    if unknowns[f] != 1:
+                        continue
+
+                    symbol = next(s for s in f.symbols if s not in planned)
+                    steps.append(PlanStep(stage, f, symbol))
+                    self._provide([symbol], planned, unknowns, next_ready)
+            else:
+                blocks = self._find_blocks(unknowns, planned) if self._ref_units is not None else []
+
+                if not blocks:
+                    break
+
+                for formulas, symbols in blocks:
+                    steps.append(BlockStep(stage, formulas, symbols))
+                    self._provide(symbols, planned, unknowns, next_ready)
+
+            ready = next_ready
+            stage += 1
+
+        return tuple(steps)
+
+    def _provide(self, symbols: Iterable[str], planned: Set[str], unknowns: Dict[Formula, int], ready: List[Formula]) -> None:
+        """Marks the symbols as planned and adds the Formulas left with exactly one unknown to "ready"."""
+        for symbol in symbols:
+            planned.add(symbol)
+
+            for g in self._index[symbol]:
+                unknowns[g] -= 1
+                if unknowns[g] == 1:
+                    ready.append(g)
+
+    def _find_blocks(self, unknowns: Dict[Formula, int], planned: Set[str]) -> List[Tuple[Tuple[Formula, ...], Tuple[str, ...]]]:
+        """
+        Finds the coupled blocks among the Formulas with several unknowns: groups of n Formulas that share exactly n
+        unknowns and do not depend on any other unknown, so that they can be solved jointly. The Formulas are matched
+        to the unknowns (maximum bipartite matching), and each strongly connected component of the graph "Formula ->
+        Formula that is matched to one of its unknowns" is a block if all its unknowns are matched inside of it.
+        Only the blocks with no more than BLOCK_SIZE Formulas are returned.
+        """
+
+        remaining = sorted([f for f, n in unknowns.items() if n >= 2], key=str)
+        adj = {f: sorted([s for s in f.symbols if s not in planned]) for f in remaining}
+
+        match_f: Dict[Formula, str] = dict()
+        match_s: Dict[str, Formula] = dict()
+        for f in remaining:
+            self._augment(f, adj, match_f, match_s)
+
+        edges = {f: [match_s[s] for s in adj[f] if s in match_s and match_s[s] is not f] for f in match_f}
+
+        blocks = list()
+        for component in self._strongly_connected(list(match_f), edges):
+            closed = all([s in match_s and match_s[s] in component for f in component for s in adj[f]])
+
+            if closed and 2 <= len(component) <= self.BLOCK_SIZE:
+                formulas = tuple(sorted(component, key=str))
+                blocks.append((formulas, tuple([match_f[f] for f in formulas])))
+
+        return blocks
+
+    @staticmethod
+    def _augment(f: Formula, adj: Dict[Formula, List[str]], match_f: Dict[Formula, str], match_s: Dict[str, Formula]) -> bool:
+        """Looks for an augmenting path from the unmatched Formula "f" and extends the matching along it."""
+        parent: Dict[str, Formula] = dict()
+        stack = [f]
+
+        while stack:
+            g = stack.pop()
+
+            for s in adj[g]:
+                if s in parent:
+                    continue
+                parent[s] = g
+
+                if s not in match_s:
+                    while s is not None:  # flip the matching along the path back to "f"
+                        g = parent[s]
+                        previous = match_f.get(g)
+                        match_f[g] = s
+                        match_s[s] = g
+                        s = previous
+                    return True
+
+                stack.append(match_s[s])
+
+        return False
+
+    @staticmethod
+    def _strongly_connected(nodes: List[Formula], edges: Dict[Formula, List[Formula]]) -> List[Set[Formula]]:
+        """Returns the strongly connected components of the graph (iterative Tarjan's algorithm)."""
+        index: Dict[Formula, int] = dict()
+        low: Dict[Formula, int] = dict()
+        on_stack: Set[Formula] = set()
+        stack: List[Formula] = list()
+        components = list()
+
+        for root in nodes:
+            if root in index:
+                continue
+
+            work = [(root, iter(edges[root]))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                v, children = work[-1]
+                w = next(children, None)
+
+                if w is None:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[v])
+                    if low[v] == index[v]:
+                        component = set()
+                        while True:
+                            u = stack.pop()
+                            on_stack.discard(u)
+                            component.add(u)
+                            if u is v:
+                                break
+                        components.append(component)
+                elif w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(edges[w])))
+                elif w in on_stack:
+                    low[v] = min(low[v], index[w])
+
+        return components
+
+    def _compile_block(self, step: BlockStep) -> Optional[Tuple[Tuple[str, ...], Callable]]:
+        """
+        Solves the equations of a coupled block jointly for the symbols of the block and lambdifies the solutions with
+        numpy. The result is cached on the class level. Returns None if sympy cannot solve the block.
+
+        :return: tuple of (argument symbols, function returning a list of solutions, one tuple of values each)
+        """
+
+        eqs = tuple([f._eq for f in step.formulas])
+        key = (eqs, step.symbols)
+
+        if key not in LinearIterator._BLOCKS:
+            unknowns = [Symbol(s) for s in step.symbols]
+
+            try:
+                sols = solve(eqs, unknowns, dict=True)
+            except NotImplementedError:
+                LinearIterator._BLOCKS[key] = None
+            else:
+                # solutions that leave one of the unknowns free do not determine the block
+                sols = [tuple([sol[u] for u in unknowns]) for sol in sols if all([u in sol for u in unknowns])]
+                sols = [sol for sol in sols if not any([e.has(*unknowns) for e in sol])]
+
+                args = tuple(sorted(set().union(*[f.symbols for f in step.formulas]) - set(step.symbols)))
+                func = lambdify([Symbol(a) for a in args], sols, modules='numpy', dummify=True)
+                LinearIterator._BLOCKS[key] = (args, func)
+
+        return LinearIterator._BLOCKS[key]
+
+    def _eval_block(self, step: BlockStep, values: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evaluates the solutions of a coupled block element-wise for the arrays of base-unit magnitudes in "values".
+        A row gets values only if exactly one solution is real there, otherwise the row is NaN.
+        """
+
+        compiled = self._compile_block(step)
+        n = len(next(iter(values.values()))) if values else 1
+        res = {s: np.full(n, np.nan) for s in step.symbols}
+
+        if compiled is None:
+            return res
+
+        args, func = compiled
+        arrays = np.broadcast_arrays(*[np.asarray(values[a], dtype=complex) for a in args])
+
+        with np.errstate(all='ignore'):
+            sols = [np.stack([np.broadcast_to(np.asarray(v, dtype=complex), (n,)) for v in sol]) for sol in func(*arrays)]
+            real = [np.all(Formula.REAL_ONLY(sol), axis=0) for sol in sols]  # the same tolerance as Formula.IMAG_TOL
+
+        if not sols:
+            return res
+
+        unique = np.sum(real, axis=0) == 1
+
+        for sol, r in zip(sols, real):
+            rows = unique & r
+            for i, s in enumerate(step.symbols):
+                res[s][rows] = sol[i].real[rows]
+
+        return res
+
     def _confirm_symbol(self, var: str, raise_exception: bool = True) -> bool:
         if Datum._symbol_forbidden(var):
             raise InvalidSymbol(var=var, details='Cannot use spaces and empty strings to define Datum.')
 
-        for f in self.formulas:
-            if var in f.symbols:
-                return True
+        if var in self._index:
+            return True
+        elif raise_exception:
+            raise UnusedSymbolError(symbol=var)
         else:
-            if raise_exception:
-                raise UnusedSymbolError(symbol=var)
-            else:
-                return False
+            return False
 
     def _confirm_units(self, var: str, u: str|Unit, raise_exception: bool = True) -> bool:
         units = Datum.normalize_units(u)
 
         if self._ref_units is not None:
-            res = units.is_compatible_with(self._ref_units[var])
+            res = Datum.units_cache.is_compatible(units, self._ref_units[var])
 
             if raise_exception and not res:
                 raise IncompatibleUnitsError(var=var, units=units, ref=self._ref_units[var])
@@ -98,11 +391,13 @@ class LinearIterator:
                     old_datum = self.read(d.symbol)
                     raise RewritingError(var=d.symbol, old=old_datum)
 
-            self._data.add(d)
+            self._values[d.symbol] = d
 
-            for f in self._formulas:
-                if d.symbol in f.symbols:
+            for f in self._index[d.symbol]:  # only the Formulas that contain the variable
+                try:
                     f.write(d, rewrite=rewrite)
+                finally:
+                    self._count_unknowns(f)
 
     @overload
     def read(self, var: str, units: Optional[str] = None) -> Datum:
@@ -120,9 +415,8 @@ class LinearIterator:
         if isinstance(var, str):
             self._confirm_symbol(var)
 
-            if self.has_value(var):
-                d = filter(lambda d: d.symbol == var, self.data)
-                d = copy(list(d)[0])  # normally, only one Datum with any symbol is allowed in self._data
+            if var in self._values:
+                d = copy(self._values[var])
 
                 if units is not None:
                     self._confirm_units(var, units)
@@ -151,12 +445,14 @@ class LinearIterator:
     def erase(self, var: Optional[str] = None) -> None:
         if var is not None:
             if self.has_value(var):
-                d = self.read(var)  # variable is confirmed here
-                self._data.remove(d)
+                del self._values[var]
 
-                for f in self.formulas:
-                    if var in f.symbols and f.has_value(var):
-                        f.erase(var)
+                for f in self._index[var]:
+                    if f.has_value(var):
+                        try:
+                            f.erase(var)
+                        finally:
+                            self._count_unknowns(f)
 
             elif var in self.symbols:
                 raise NoValueError(symbol=var)
@@ -169,11 +465,15 @@ class LinearIterator:
                 if self.has_value(s):
                     self.erase(s)
 
+    def copy(self) -> LinearIterator:
+        """Returns an independent copy with copies of all the Formulas and written Datum instances"""
+        return deepcopy(self)
+
 
     # ========================================================================================================= ANALYSIS
     def has_value(self, var: str) -> bool:
         self._confirm_symbol(var)
-        return len(list(filter(lambda d: d.symbol == var, self.data))) > 0
+        return var in self._values
 
     # ===================================================================================================== CALCULATIONS
     def iter(self) -> Set[Datum]:
@@ -190,9 +490,47 @@ class LinearIterator:
             res = res.union(r)  # since each Datum in LI must have its own symbol, no overlaps are expected
         return res
 
+    def plan(self, known_symbols: Iterable[str]) -> Tuple[PlanStep|BlockStep, ...]:
+        """
+        Returns the ordered derivation plan for the given set of known variables: which Formula produces which
+        variable, and at which stage. Coupled Formulas that share several unknowns (for example, 'a + b = s' and
+        'a - b = d' for unknown a and b) are planned as one BlockStep and solved jointly, if the reference units are
+        specified. The plan is built from the Formula/symbol graph only, without any numeric work, and is cached by the
+        set of known variables.
+
+        :param known_symbols: the variables that have values
+        :return: tuple of PlanStep and BlockStep instances in the order of execution
+        """
+
+        known = frozenset(known_symbols)
+
+        if known not in self._plans:
+            for s in known:
+                self._confirm_symbol(s)
+
+            self._plans[known] = self._make_plan(known)
+
+        return self._plans[known]
+
     def solve(self) -> Optional[Datum]:
-        while self.solvables:
-            res = self.iter()
+        """
+        Solves the system by running the plan (see .plan()) for the variables that currently have values. The
+        steps of one stage are solved and written together. If the target is specified, the solving stops after the
+        stage at which the target is found.
+
+        :return: the target Datum in the target units, or None if the target is not specified
+        """
+
+        steps = self.plan(self._values)
+
+        for _, stage in groupby(steps, key=attrgetter('stage')):
+            res = set()
+
+            for step in stage:
+                if isinstance(step, BlockStep):
+                    res = res.union(self._solve_block(step))
+                elif self._unknowns[step.formula] == 1:  # an earlier step could have given no (real) solution
+                    res = res.union(step.formula.solve(rounding=False))
 
             self.write(*res)
 
@@ -208,35 +546,462 @@ class LinearIterator:
         else:
             raise UnreachableTarget(target=self.target.symbol)
 
+    def _solve_block(self, step: BlockStep) -> Set[Datum]:
+        """
+        Solves a coupled block for the written values. Returns the Datums in the reference units, or an empty set if
+        the block has no unique real solution or not all the values it needs are written.
+        """
+
+        values = {s: np.array([d.base_magnitude]) for s, d in self._values.items()}
+
+        if any([s in values for s in step.symbols]):
+            return set()
+
+        compiled = self._compile_block(step)
+        if compiled is None or not all([a in values for a in compiled[0]]):
+            return set()
+
+        res = set()
+        for s, v in self._eval_block(step, values).items():
+            if np.isnan(v[0]):
+                return set()
+
+            u = Datum.normalize_units(self._ref_units[s])
+            d = Datum._trusted(s, float(v[0]), Datum.units_cache.base_units(u))
+            d.ito(u)
+            res.add(d)
+
+        return res
+
+    def solve_linear(self) -> LinearSolution:
+        """
+        Solves all the Formulas that are linear in their unknowns at once instead of Formula by Formula. The
+        coefficient matrix and the right-hand side are assembled from the compiled linear forms of the Formulas (see
+        Formula._linear_form()) with the written values in base units, and the system is solved with a single
+        (least-squares) factorization. This also solves coupled linear systems of any size.
+
+        A variable is determined when the system fixes its value, whatever the values of the other unknowns are. The
+        determined values are written in the reference units. The remaining unknowns (including the ones that only
+        appear in non-linear Formulas) are reported as under-determined. The reference units are required.
+
+        :return: LinearSolution with the set of the found Datums and the set of under-determined variables
+        """
+
+        if self._ref_units is None:
+            raise Exception('Specify reference units to solve the system as a linear system.')
+
+        values = {s: d.base_magnitude for s, d in self._values.items()}
+        unknowns = sorted(self.symbols - set(values))
+        column = {u: j for j, u in enumerate(unknowns)}
+
+        rows = list()
+        rhs = list()
+
+        used = list()  # the Formula of each row
+
+        for f in sorted(self._formulas, key=str):
+            f_unknowns = sorted(f.symbols - set(values))
+            linear = f._linear_form(f_unknowns) if f_unknowns else None
+
+            if linear is None:
+                continue
+
+            args, func = linear
+
+            try:
+                *coefficients, constant = func(*[values[a] for a in args])
+            except (ZeroDivisionError, ValueError, OverflowError):
+                continue
+
+            row = np.zeros(len(unknowns))
+            for u, c in zip(f_unknowns, coefficients):
+                row[column[u]] = c
+
+            rows.append(row)
+            rhs.append(-constant)
+            used.append(f)
+
+        if not rows:
+            return LinearSolution(set(), set(unknowns))
+
+        a, b = np.array(rows, dtype=float), np.array(rhs, dtype=float)
+        x, determined = self._lstsq(a, b)
+        self._check_residuals(used, a, x, b)
+
+        res = set()
+        for u, v, det in zip(unknowns, x, determined):
+            if det:
+                ref = Datum.normalize_units(self._ref_units[u])
+                d = Datum._trusted(u, float(v), Datum.units_cache.base_units(ref))
+                d.ito(ref)
+                res.add(d)
+
+        self._write_all(res)
+
+        return LinearSolution(res, set([u for u, det in zip(unknowns, determined) if not det]))
+
+    def solve_monomial(self) -> LinearSolution:
+        """
+        Solves all the monomial Formulas (products of powers, such as 'n = mps/M' or 'p*V = n*R*T', see
+        Formula._as_monomial()) at once. Taking logarithms turns them into a linear system in the logarithms of the
+        magnitudes (in base units) with the exponents as coefficients, which is solved with one factorization (see
+        .solve_linear()). Unlike the iterative solving, this also handles cyclic couplings of any size.
+
+        The signs are found from the parities of the integer exponents; a sign that is not fixed by the system is taken
+        positive. Formulas with a zero known value cannot be used in the logarithmic form and are skipped, as well
+        as the Formulas that are not monomial. The reference units are required.
+
+        :return: LinearSolution with the set of the found Datums and the set of under-determined variables
+        """
+
+        if self._ref_units is None:
+            raise Exception('Specify reference units to solve the system in the logarithmic form.')
+
+        values = {s: d.base_magnitude for s, d in self._values.items()}
+        unknowns = sorted(self.symbols - set(values))
+        column = {u: j for j, u in enumerate(unknowns)}
+
+        rows = list()
+        rhs = list()
+        parities = list()  # (bit mask of the unknowns with odd exponents, sign bit of the right-hand side)
+        used = list()  # the Formula of each row
+        parity_used = list()  # the Formula of each parity equation
+
+        for f in sorted(self._formulas, key=str):
+            if f._monomial is None:
+                continue
+
+            k, exponents = f._monomial
+            known = {s: e for s, e in exponents.items() if s in values}
+
+            if len(known) == len(exponents) or any([values[s] == 0 for s in known]):
+                continue
+
+            row = np.zeros(len(unknowns))
+            for s, e in exponents.items():
+                if s not in known:
+                    row[column[s]] = float(e)
+
+            rows.append(row)
+            rhs.append(np.log(abs(k)) - sum([float(e) * np.log(abs(values[s])) for s, e in known.items()]))
+            used.append(f)
+
+            if all([e.is_integer() for e in exponents.values()]):
+                mask = sum([1 << column[s] for s, e in exponents.items() if s not in known and e % 2])
+                bit = int(k < 0) ^ (sum([int(values[s] < 0) for s, e in known.items() if e % 2]) % 2)
+                parities.append((mask, bit))
+                parity_used.append(f)
+
+        if not rows:
+            return LinearSolution(set(), set(unknowns))
+
+        a, b = np.array(rows, dtype=float), np.array(rhs, dtype=float)
+        x, determined = self._lstsq(a, b)
+        self._check_residuals(used, a, x, b)
+
+        signs = self._parity_solve(parities)
+        negative = sum([1 << j for j, bit in signs.items() if bit])
+        contradicting = [f for f, (mask, bit) in zip(parity_used, parities) if bin(mask & negative).count('1') % 2 != bit]
+        if contradicting:
+            raise ConsistencyError(
+                formula=', '.join(sorted([f.eq_str for f in contradicting])),
+                details='The signs of the known values contradict each other. No values were written.'
+            )
+
+        res = set()
+        for j, (u, v, det) in enumerate(zip(unknowns, x, determined)):
+            if det:
+                ref = Datum.normalize_units(self._ref_units[u])
+                d = Datum._trusted(u, (-1) ** signs.get(j, 0) * float(np.exp(v)), Datum.units_cache.base_units(ref))
+                d.ito(ref)
+                res.add(d)
+
+        self._write_all(res)
+
+        return LinearSolution(res, set([u for u, det in zip(unknowns, determined) if not det]))
+
+    @staticmethod
+    def _check_residuals(formulas: List[Formula], a: np.ndarray, x: np.ndarray, b: np.ndarray) -> None:
+        """
+        Raises ConsistencyError naming the Formulas whose rows of the system a @ x = b are not satisfied by the
+        least-squares solution "x" (see LINEAR_REL_TOL), i.e. the known values contradict each other.
+        """
+
+        residual = np.abs(a @ x - b)
+        contradicting = residual > LinearIterator.LINEAR_REL_TOL * (np.abs(a) @ np.abs(x) + np.abs(b))
+
+        if np.any(contradicting):
+            raise ConsistencyError(
+                formula=', '.join(sorted([f.eq_str for f, c in zip(formulas, contradicting) if c])),
+                details='The known values over-determine the system and contradict each other. No values were written.'
+            )
+
+    def _write_all(self, data: Iterable[Datum]) -> None:
+        """Writes new values all at once: if writing one of them fails, the ones written before are erased again."""
+
+        written = list()
+        try:
+            for d in data:
+                written.append(d.symbol)
+                self.write(d)
+        except Exception:
+            for s in written:
+                if self.has_value(s):
+                    self.erase(s)
+            raise
+
+    @staticmethod
+    def _parity_solve(equations: List[Tuple[int, int]]) -> Dict[int, int]:
+        """
+        Solves a system of linear equations over GF(2), each given as (bit mask of the variables, right-hand side bit).
+        Returns the particular solution with all the free variables set to 0, as a dict {variable: bit} for the pivot
+        variables. Inconsistent equations are ignored.
+        """
+
+        pivots: Dict[int, Tuple[int, int]] = dict()  # pivot variable -> (mask, bit) of the reduced equation
+
+        for mask, bit in equations:
+            for p, (pm, pb) in pivots.items():
+                if mask >> p & 1:
+                    mask, bit = mask ^ pm, bit ^ pb
+
+            if mask:
+                p = mask.bit_length() - 1
+                for q, (qm, qb) in list(pivots.items()):  # keep the equations fully reduced
+                    if qm >> p & 1:
+                        pivots[q] = (qm ^ mask, qb ^ bit)
+                pivots[p] = (mask, bit)
+
+        # with the free variables set to 0, each pivot variable equals the right-hand side of its reduced equation
+        return {p: bit for p, (mask, bit) in pivots.items()}
+
+    @staticmethod
+    def _lstsq(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Solves a @ x = b in the least-squares sense with one SVD of the column-scaled matrix. Returns the minimum-norm
+        solution and a boolean array telling which components of x are determined, i.e. do not change along the null
+        space of "a".
+        """
+
+        scale = np.linalg.norm(a, axis=0)
+        scale[scale == 0] = 1.0
+        a = a / scale
+
+        u, sv, vt = np.linalg.svd(a, full_matrices=False)
+        tol = max(a.shape) * np.finfo(float).eps * (sv[0] if len(sv) else 0.0)
+        rank = int(np.sum(sv > tol))
+
+        y = vt[:rank].T @ ((u[:, :rank].T @ b) / sv[:rank])
+        # a component is determined if its unit vector lies in the row space: the squared norm of its projection onto
+        # the row space is 1, the rest lies in the null space
+        determined = 1.0 - np.sum(vt[:rank] ** 2, axis=0) <= 1e-12
+
+        return y / scale, determined
+
+    def solve_many(
+            self,
+            table: Dict[str, Iterable[float|int]],
+            units: Optional[Dict[str, str|Unit]] = None
+    ) -> Dict[str, np.ma.MaskedArray]:
+        """
+        Solves the system for many scenarios at once. Each row of the "table" is a scenario, each column holds the
+        magnitudes of one variable. Missing values are marked by a mask (numpy masked arrays) or by NaN, so each row
+        can have its own set of known variables. The rows are grouped by the set of known variables, and each group is
+        solved with one plan (see .plan()) evaluated over whole columns with Formula.solve_batch().
+
+        The values written to the LinearIterator are not used and not changed, and the consistency of over-determined
+        scenarios is not checked. The reference units are required.
+
+        :param table: dict of the form {symbol: magnitudes}, all the columns must have the same length
+        :param units: units of the columns; the reference units are used for the columns that are not in the dict
+        :return: dict with a masked array for every variable of the system in its reference units. The values that
+        cannot be found for a scenario (unreachable, complex or ambiguous solutions) are masked and set to NaN.
+        """
+
+        if self._ref_units is None:
+            raise Exception('Specify reference units to solve the system for many scenarios.')
+
+        columns = self._read_table(table, units)
+        n = len(next(iter(columns.values()))) if columns else 0
+        symbols = sorted(columns)
+        res = {s: np.full(n, np.nan) for s in self.symbols}
+
+        if n == 0:
+            return {s: np.ma.masked_invalid(v) for s, v in res.items()}
+
+        known = ~np.isnan(np.stack([columns[s] for s in symbols], axis=1))
+        patterns, groups = np.unique(known, axis=0, return_inverse=True)
+
+        for i, pattern in enumerate(patterns):
+            rows = np.flatnonzero(groups.ravel() == i)
+            values = {s: columns[s][rows] for s, k in zip(symbols, pattern) if k}
+
+            for step in self.plan(values):
+                if isinstance(step, BlockStep):
+                    base = {s: self._to_base(s, v) for s, v in values.items()}
+                    for s, v in self._eval_block(step, base).items():
+                        values[s] = self._from_base(s, v)
+                    continue
+
+                cols = {s: (values[s], self._ref_units[s]) for s in step.formula.symbols if s != step.symbol}
+
+                try:
+                    sols = step.formula.solve_batch(cols)
+                except EquationNotSolvable:  # no closed-form solution, the same for all the rows
+                    values[step.symbol] = np.full(len(rows), np.nan)
+                    continue
+
+                with np.errstate(invalid='ignore'):
+                    hi = np.fmax.reduce(sols, axis=1)
+                    lo = np.fmin.reduce(sols, axis=1)
+                    values[step.symbol] = np.where(np.isclose(hi, lo), hi, np.nan)  # several different roots are ambiguous
+
+            for s, v in values.items():
+                res[s][rows] = v
+
+        return {s: np.ma.masked_invalid(v) for s, v in res.items()}
+
+    def verify(
+            self,
+            table: Optional[Dict[str, Iterable[float|int]]] = None,
+            units: Optional[Dict[str, str|Unit]] = None
+    ) -> Verification:
+        """
+        Checks that all the Formulas are consistent with the values, e.g. after .solve() or .solve_many(). Both sides
+        of all the equations are evaluated in a single vectorized pass, so no Datum instances are created and sympy is
+        not used.
+
+        Without a table, the written values are checked. The "table" holds scenarios as in .solve_many() (its result
+        can be passed as it is), and the reference units are then required.
+
+        The relative residual of an equation is |LHS - RHS| / max(|LHS|, |RHS|, Formula.CONSISTENCY_ABS_TOL /
+        Formula.CONSISTENCY_REL_TOL), so a Formula is consistent (as in Formula.consistency_check()) when its residual
+        does not exceed Formula.CONSISTENCY_REL_TOL. The residual is NaN if a variable of the Formula has no value.
+
+        :param table: dict of the form {symbol: magnitudes}, all the columns must have the same length
+        :param units: units of the columns; the reference units are used for the columns that are not in the dict
+        :return: Verification with the worst residual of each Formula (over all the scenarios), the worst residual of
+        each scenario (over all the Formulas) and the set of inconsistent Formulas
+        """
+
+        if table is None:
+            values = {s: np.atleast_1d(d.base_magnitude) for s, d in self._values.items()}
+        elif self._ref_units is None:
+            raise Exception('Specify reference units to verify the system for many scenarios.')
+        else:
+            values = {s: self._to_base(s, v) for s, v in self._read_table(table, units).items()}
+
+        formulas = tuple(sorted(self._formulas, key=str))
+        args, func = self._compile_sides(formulas)
+        n = len(next(iter(values.values()))) if values else 1
+        arrays = [values[a] if a in values else np.full(n, np.nan) for a in args]
+
+        with np.errstate(all='ignore'):
+            sides = [np.broadcast_to(np.asarray(side, dtype=float), (n,)) for side in func(*arrays)]
+            lhs, rhs = np.array(sides[0::2]), np.array(sides[1::2])
+            scale = np.maximum(np.maximum(np.abs(lhs), np.abs(rhs)), Formula.CONSISTENCY_ABS_TOL / Formula.CONSISTENCY_REL_TOL)
+            residuals = np.where(lhs == rhs, 0.0, np.abs(lhs - rhs) / scale)  # one row per Formula, one column per scenario
+
+        worst = np.fmax.reduce(residuals, axis=1)
+        by_formula = {f: float(r) for f, r in zip(formulas, worst)}
+        inconsistent = set([f for f, r in zip(formulas, worst) if r > Formula.CONSISTENCY_REL_TOL])
+        scenarios = np.fmax.reduce(residuals, axis=0) if table is not None else None
+
+        return Verification(by_formula, scenarios, inconsistent)
+
+    @staticmethod
+    def _compile_sides(formulas: Tuple[Formula, ...]) -> Tuple[Tuple[str, ...], Callable]:
+        """Lambdifies both sides of all the equations of "formulas" with numpy into one function of base-unit
+        magnitudes (see .verify()). If numpy lacks some of the functions, the sides are evaluated Formula by Formula
+        (see Formula._sides_batch())."""
+
+        key = tuple([f._eq for f in formulas])
+
+        if key not in LinearIterator._SIDES:
+            args = tuple(sorted(set().union(*[f.symbols for f in formulas])))
+            sides = [side for f in formulas for side in (f._eq.lhs, f._eq.rhs)]
+            func = _lambdify(args, sides, 'numpy')
+
+            if func is None:
+                def func(*arrays, _args=args, _formulas=formulas):
+                    values = dict(zip(_args, arrays))
+                    return [side for f in _formulas for side in f._sides_batch(values)]
+
+            LinearIterator._SIDES[key] = (args, func)
+
+        return LinearIterator._SIDES[key]
+
+    def _read_table(
+            self,
+            table: Dict[str, Iterable[float|int]],
+            units: Optional[Dict[str, str|Unit]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Converts the columns of a table of scenarios (see .solve_many()) to the reference units. The missing
+        values (masked or NaN) are NaN."""
+
+        units = dict() if units is None else units
+        columns = dict()
+
+        for s, col in table.items():
+            self._confirm_symbol(s)
+            u = units.get(s, self._ref_units[s])
+            self._confirm_units(s, u)
+
+            col = np.ma.masked_invalid(np.ma.asarray(col, dtype=float))
+            mags = Datum.units_cache.convert(col.filled(np.nan), u, self._ref_units[s])
+            columns[s] = np.where(np.ma.getmaskarray(col), np.nan, mags)
+
+        if len(set([len(c) for c in columns.values()])) > 1:
+            raise ValueError('All the columns of the table must have the same length.')
+
+        return columns
+
+    def _to_base(self, symbol: str, mags: np.ndarray) -> np.ndarray:
+        """Converts magnitudes in the reference units of "symbol" to base units."""
+        return Datum.units_cache.to_base(mags, self._ref_units[symbol])
+
+    def _from_base(self, symbol: str, mags: np.ndarray) -> np.ndarray:
+        """Converts magnitudes in base units to the reference units of "symbol"."""
+        u = self._ref_units[symbol]
+        return Datum.units_cache.convert(mags, Datum.units_cache.base_units(u), u)
+
 
     # ======================================================================================================= PROPERTIES
     @property
     def solvables(self) -> Set[Formula]:
-        solvable_eqs = set()
-
-        for f in self.formulas:
-            if f.solvable and not f.all_values:
-                solvable_eqs.add(f)
-
-        return solvable_eqs
+        """Returns the Formulas with exactly one unknown. The set is maintained by .write() and .erase()."""
+        return set(self._ready)
 
     @property
-    def data(self) -> Set[Datum]:
-        return deepcopy(self._data)
+    def data(self) -> FrozenSet[Datum]:
+        """
+        Returns a read-only set of the written Datum instances. Only the set is read-only: the Datums are the live
+        instances (not copies, to keep the access cheap), so changing them in place (e.g. with Datum.ito()) changes the
+        written values. Use .copy() for independent instances.
+        """
+        return frozenset(self._values.values())
 
     @property
-    def symbols(self) -> Set[str]:
-        symbols = set()
+    def _data(self) -> Set[Datum]:
+        """The set of written Datum instances. The whole set can be replaced at once by assignment."""
+        return set(self._values.values())
 
-        for f in self.formulas:
-            for s in f.symbols:
-                symbols.add(s)
+    @_data.setter
+    def _data(self, data: Iterable[Datum]) -> None:
+        self._values = {d.symbol: d for d in data}
 
-        return symbols
+    @property
+    def symbols(self) -> Set[str]:
+        return set(self._index)
 
     @property
-    def formulas(self) -> Set[Formula]:
-        return deepcopy(self._formulas)
+    def formulas(self) -> FrozenSet[Formula]:
+        """
+        Returns a read-only set of the Formulas. Only the set is read-only: the Formulas are the live instances (not
+        copies, to keep the access cheap), so writing to or erasing from them (e.g. with Formula.write()) bypasses and
+        desynchronizes the LinearIterator. Use .copy() for independent instances.
+        """
+        return frozenset(self._formulas)
 
     @property
     def target(self) -> Datum:
@@ -0,0 +1,197 @@
+"""
+Purpose: intern the units used by Datum, Formula and LinearIterator so that each distinct unit is parsed by pint only
+once and is represented by one shared Unit instance, together with the data derived from it (dimensionality, base
+units and the linear conversion to base units).
+
+Invariants
+    - all Units are created by the UnitRegistry passed at initialization
+    - equal units (e.g. 'm', 'meter' and Unit('meter')) map to the same UnitInfo and thus to the same Unit instance
+    - the number of cached keys never exceeds "maxsize"; the least recently used keys are dropped first
+
+Public methods
+    # initializer
+        __init__(ureg: UnitRegistry, maxsize: int = 1024) -> None
+
+    # lookups
+        .info(u: str|Unit) -> UnitInfo
+        .unit(u: str|Unit) -> Unit
+        .dimensionality(u: str|Unit) -> UnitsContainer
+        .base_units(u: str|Unit) -> Unit
+        .is_compatible(u1: str|Unit, u2: str|Unit) -> bool
+        .conversion(u_from: str|Unit, u_to: str|Unit) -> Optional[Tuple[float, float]]
+
+    # conversions
+        .convert(magnitude: float|np.ndarray, u_from: str|Unit, u_to: str|Unit) -> float|np.ndarray
+        .to_base(magnitude: float|np.ndarray, u: str|Unit) -> float|np.ndarray
+
+    # maintenance
+        .clear() -> None
+
+    # attributes
+        .hits -> int
+        .misses -> int
+        .maxsize -> int
+"""
+
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from math import isclose
+from typing import NamedTuple, Optional, Hashable, Tuple
+
+from pint import UnitRegistry, Unit
+
+
+class UnitInfo(NamedTuple):
+    unit: Unit
+    dimensionality: object  # pint UnitsContainer
+    base_units: Unit
+    factor: Optional[float]  # magnitude in base units = factor * magnitude + offset; None if not linear (e.g. dB)
+    offset: Optional[float]
+
+
+class UnitCache:
+    def __init__(self, ureg: UnitRegistry, maxsize: int = 1024) -> None:
+        if maxsize < 1:
+            raise ValueError(f'The cache size must be positive, got {maxsize}.')
+
+        self._ureg = ureg
+        self._entries: OrderedDict[Hashable, UnitInfo] = OrderedDict()
+        # (from unit, to unit) -> (factor, offset), None if the conversion is not linear or the units are incompatible
+        self._conversions: OrderedDict[Tuple[Unit, Unit], Optional[Tuple[float, float]]] = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self, u: str|Unit) -> UnitInfo:
+        """
+        Returns the cached UnitInfo of "u". On a miss, the unit is parsed and the result is shared with all the keys
+        denoting the same unit.
+        """
+
+        # the keys keep 'm' (the string) and Unit('m') apart, since pint compares them as equal
+        if isinstance(u, str):
+            key = (True, u)
+        elif isinstance(u, Unit):
+            if u._REGISTRY is not self._ureg:  # pint cannot compare Units of different registries
+                u = str(u)
+            key = (isinstance(u, str), u)
+        else:
+            raise TypeError(f'Expected "str" or "Unit", got "{type(u)}".')
+
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        unit = self._ureg.Unit(u)
+        unit_key = (False, unit)
+
+        entry = self._entries.get(unit_key)
+        if entry is None:
+            entry = self._make_info(unit)
+            self._store(unit_key, entry)
+
+        self._store(key, entry)
+        return entry
+
+    def unit(self, u: str|Unit) -> Unit:
+        return self.info(u).unit
+
+    def dimensionality(self, u: str|Unit):
+        return self.info(u).dimensionality
+
+    def base_units(self, u: str|Unit) -> Unit:
+        return self.info(u).base_units
+
+    def is_compatible(self, u1: str|Unit, u2: str|Unit) -> bool:
+        return self.info(u1).dimensionality == self.info(u2).dimensionality
+
+    def conversion(self, u_from: str|Unit, u_to: str|Unit) -> Optional[Tuple[float, float]]:
+        """
+        Returns (factor, offset) such that magnitude in "u_to" = factor * magnitude in "u_from" + offset. Returns None
+        if the units are incompatible or the conversion is not linear; pint must be used in such cases.
+        """
+
+        i_from, i_to = self.info(u_from), self.info(u_to)
+        key = (i_from.unit, i_to.unit)
+
+        try:
+            conv = self._conversions[key]
+        except KeyError:
+            if i_from.unit == i_to.unit:
+                conv = (1.0, 0.0)
+            elif i_from.factor is None or i_to.factor is None or i_from.dimensionality != i_to.dimensionality:
+                conv = None
+            else:
+                conv = (i_from.factor / i_to.factor, (i_from.offset - i_to.offset) / i_to.factor)
+
+            self._conversions[key] = conv
+            while len(self._conversions) > self.maxsize:
+                self._conversions.popitem(last=False)
+        else:
+            self._conversions.move_to_end(key)
+
+        return conv
+
+    def convert(self, magnitude, u_from: str|Unit, u_to: str|Unit):
+        """
+        Converts a magnitude (or an array of magnitudes) from "u_from" to "u_to" with the cached conversion factor,
+        falling back to pint for non-linear units. Raises pint.DimensionalityError for incompatible units.
+        """
+
+        conv = self.conversion(u_from, u_to)
+
+        if conv is None:
+            return self._ureg.Quantity(magnitude, self.unit(u_from)).to(self.unit(u_to)).magnitude
+
+        factor, offset = conv
+        return magnitude * factor + offset if offset else magnitude * factor
+
+    def to_base(self, magnitude, u: str|Unit):
+        """Converts a magnitude (or an array of magnitudes) from "u" to the base units of "u"."""
+
+        return self.convert(magnitude, u, self.info(u).base_units)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._conversions.clear()
+        self.hits = 0
+        self.misses = 0
+
+    # private helpers
+    def _store(self, key: Hashable, entry: UnitInfo) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _make_info(self, unit: Unit) -> UnitInfo:
+        """Computes the data derived from "unit". The conversion to base units is probed at 0 and 2 to detect offsets and
+        non-linear units (e.g. decibel)."""
+
+        q1 = self._ureg.Quantity(1.0, unit).to_base_units()
+
+        try:
+            offset = self._ureg.Quantity(0.0, unit).to_base_units().magnitude
+            if offset == 0:
+                factor = q1.magnitude
+            else:  # a distant probe keeps the cancellation error of the difference small
+                factor = (self._ureg.Quantity(1e3, unit).to_base_units().magnitude - offset) / 1e3
+            linear = isclose(self._ureg.Quantity(2.0, unit).to_base_units().magnitude, 2 * factor + offset, rel_tol=1e-12)
+        except (ValueError, ArithmeticError):
+            linear = False
+
+        if not linear:
+            factor = offset = None
+
+        return UnitInfo(unit, unit.dimensionality, q1.units, factor, offset)
@@ -1,3 +1,37 @@
-from QCalculator.Datum import Datum
-from QCalculator.Formula import Formula
-from QCalculator.LinearIterator import LinearIterator
+import importlib
+import sys
+import types
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from QCalculator.Datum import Datum
+    from QCalculator.DatumFile import DatumFile
+    from QCalculator.Formula import Formula
+    from QCalculator.LinearIterator import LinearIterator
+
+__all__ = ['Datum', 'DatumFile', 'Formula', 'LinearIterator']
+
+
+class _Package(types.ModuleType):
+    """
+    The classes are imported on the first access (PEP 562), so that importing QCalculator does not import pint and
+    sympy. Each class lives in the submodule of the same name, and the import system binds the submodule to the package
+    attribute once it is loaded; the class is bound instead.
+    """
+
+    def __getattr__(self, name: str):
+        if name in __all__:
+            importlib.import_module(f'{__name__}.{name}')  # binds the class, see __setattr__
+            return self.__dict__[name]
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    def __setattr__(self, name: str, value) -> None:
+        if name in __all__ and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(__all__))
+
+
+sys.modules[__name__].__class__ = _Package
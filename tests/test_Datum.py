@@ -1,3 +1,7 @@
+import subprocess
+import sys
+
+import numpy as np
 import pint
 import pytest
 from pint import Quantity, UnitRegistry, UndefinedUnitError
@@ -126,6 +130,44 @@ def test_from_string():
     with pytest.raises(InitializationError):
         Datum.from_string('= 10 km')  # empty string or space cannot be used as symbol
 
+DEFINITIONS = ['t = 15.2 ms\n', '\n', 'df = 2.0\n', '  v=2.5e3 m/s  \n']
+
+def test_from_strings():
+    res = Datum.from_strings(DEFINITIONS)
+
+    assert not isinstance(res, list)  # lazy
+    assert list(res) == [Datum('t', 15.2, 'ms'), Datum('df', 2.0, ''), Datum('v', 2500, 'm/s')]
+
+def test_from_strings_columnar():
+    symbols, magnitudes, units = Datum.from_strings(DEFINITIONS, columnar=True)
+
+    assert symbols.tolist() == ['t', 'df', 'v']
+    np.testing.assert_array_equal(magnitudes, [15.2, 2.0, 2500.0])
+    assert units.tolist() == [ur.Unit('ms'), ur.Unit('dimensionless'), ur.Unit('m/s')]
+
+@pytest.mark.parametrize("as_str", [pytest.param(False, id='path'), pytest.param(True, id='str')])
+def test_from_strings_file(tmp_path, as_str):
+    path = tmp_path / 'data.txt'
+    path.write_text(''.join(DEFINITIONS))
+    path = str(path) if as_str else path
+
+    assert [str(d) for d in Datum.from_strings(path)] == [str(Datum.from_string(s)) for s in DEFINITIONS if s.strip()]
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        pytest.param('definitely not a Datum definition string', id='no-equality-sign'),
+        pytest.param('N = 6.02e23', id='sympy-name'),
+        pytest.param('m=10km', id='no-space-before-units'),
+        pytest.param('= 10 km', id='empty-symbol'),
+        pytest.param('y = 2 furlongz', id='undefined-units'),
+        pytest.param('y = 2 (m', id='malformed-units'),
+    ]
+)
+def test_from_strings_exceptions(line):
+    with pytest.raises(InitializationError, match='line 2'):
+        list(Datum.from_strings(['x = 1 m', line]))
+
 
 def test_to_datum():
     # initialization from string
@@ -618,3 +660,133 @@ def test_base_units_and_str_ppt(d1, d2, d3):
     assert d1.base_units_str == 'meter'
     assert d2.base_units_str == 'second'
     assert d3.base_units_str == 'meter'
+
+def test_base_magnitude_ppt(d1, d3):
+    assert d1.base_magnitude == 2.0
+    assert d3.base_magnitude == pytest.approx(0.255)
+    assert d3.base_quantity == ur.Quantity(0.255, 'meter')
+
+def test_base_magnitude_follows_mutators(d3):
+    d3.ito('mm')
+    assert d3.magnitude == pytest.approx(255)
+    assert d3.base_magnitude == pytest.approx(0.255)
+
+    d3.iscale(2)
+    assert d3.base_magnitude == pytest.approx(0.51)
+    assert d3.quantity == ur.Quantity(510, 'mm')
+
+def test_slots(d1):
+    assert not hasattr(d1, '__dict__')
+
+    q = d1.quantity
+    q.ito('cm')
+    assert d1.quantity == ur.Quantity(2, 'meter')  # the cached quantity cannot be changed from outside
+
+@pytest.mark.parametrize(
+    "symbol, expected",
+    [
+        pytest.param('x_1', True, id='identifier'),
+        pytest.param('E', True, id='sympy-constant'),
+        pytest.param('N', False, id='sympy-function'),
+        pytest.param('len', False, id='builtin-function'),
+        pytest.param('lambda', False, id='keyword'),
+    ]
+)
+def test_sympy_symbol_check(symbol, expected):
+    assert Datum._sympy_symbol_check(symbol) == expected
+
+    hits = Datum._sympy_symbol_check.cache_info().hits
+    assert Datum._sympy_symbol_check(symbol) == expected
+    assert Datum._sympy_symbol_check.cache_info().hits == hits + 1
+
+def test_sympy_symbol_check_bounded():
+    for i in range(2000):
+        Datum._sympy_symbol_check(f'x{i}')
+
+    info = Datum._sympy_symbol_check.cache_info()
+    assert info.currsize <= info.maxsize == 1024
+
+def test_sympy_names():
+    """The static list covers all the names parse_expr() takes from the installed sympy."""
+    import sympy
+    from QCalculator._sympy_names import SYMPY_NAMES
+
+    assert set(sympy.__all__) <= SYMPY_NAMES
+
+def test_trusted(d3):
+    d = Datum._trusted('d', 25.5, ur.Unit('centimeter'))
+    assert d == d3
+    assert isinstance(d.magnitude, float)
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        pytest.param('import QCalculator', ['False', 'False'], id='package'),
+        pytest.param('from QCalculator import Datum', ['False', 'True'], id='Datum'),
+        pytest.param(
+            "from QCalculator import Datum; Datum('m1', 10, 'kg'); Datum.from_string('v = 2 m/s')",
+            ['False', 'True'],
+            id='Datum-instances'
+        ),
+    ]
+)
+def test_lazy_imports(code, expected):
+    check = "import sys; print('sympy' in sys.modules, 'pint' in sys.modules)"
+    out = subprocess.run([sys.executable, '-c', f'{code}; {check}'], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == expected
+
+def test_lazy_registry():
+    code = (
+        "from QCalculator import Datum; "
+        "print(type(Datum.__dict__['ureg']).__name__); "
+        "Datum.ureg; "
+        "print(type(Datum.__dict__['ureg']).__name__)"
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ['_LazyClassAttribute', 'UnitRegistry']
+
+
+# ======================================================================================================= array magnitudes
+@pytest.fixture
+def da():
+    return Datum('d', [25.5, 10.0, -1.0], 'cm')
+
+def test_array_init(da):
+    assert isinstance(da.magnitude, np.ndarray)
+    np.testing.assert_allclose(da.base_magnitude, [0.255, 0.1, -0.01])
+
+    with pytest.raises(ValueError):
+        da.magnitude[0] = 1.0  # read-only, so that the base magnitude stays in sync
+
+@pytest.mark.parametrize(
+    "method, args, expected",
+    [
+        pytest.param('to', ('m',), ur.Quantity([0.255, 0.1, -0.01], 'm'), id='to'),
+        pytest.param('scale', (np.array([2, 1, 0]),), ur.Quantity([51, 10, 0], 'cm'), id='scale'),
+        pytest.param('mul', (ur.Quantity(2, ''),), ur.Quantity([51, 20, -2], 'cm'), id='mul'),
+        pytest.param('add', (Datum('d', 1, 'm'),), ur.Quantity([125.5, 110, 99], 'cm'), id='add'),
+        pytest.param('div', (Datum('t', 2, 's'),), ur.Quantity([12.75, 5, -0.5], 'cm/s'), id='div'),
+        pytest.param('pow', (2,), ur.Quantity([650.25, 100, 1], 'cm**2'), id='pow'),
+    ]
+)
+def test_array_arithmetics(da, method, args, expected):
+    res = getattr(da, method)(*args)
+    q = res.quantity if isinstance(res, Datum) else res
+
+    np.testing.assert_allclose(q.to(expected.units).magnitude, expected.magnitude)
+
+@pytest.mark.parametrize(
+    "other, expected",
+    [
+        pytest.param(Datum('d', [0.255, 0.1, -0.0100001], 'm'), [True, True, False], id='element-wise'),
+        pytest.param(Datum('d', 0.1, 'm'), [False, True, False], id='broadcast'),
+        pytest.param(Datum('x', [25.5, 10.0, -1.0], 'cm'), [False, False, False], id='other-symbol'),
+    ]
+)
+def test_array_isclose(da, other, expected):
+    assert da.isclose(other).tolist() == expected
+
+def test_array_eq(da):
+    assert da == Datum('d', np.array([0.255, 0.1, -0.01]), 'm')
+    assert not da == Datum('d', [25.5, 10.0], 'cm')
+    assert Datum('d', 25.5, 'cm').isclose(Datum('d', 0.255, 'm')) is True
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from QCalculator import Datum, DatumFile
+from QCalculator.Exceptions.DatumExceptions import InitializationError
+
+
+ur = Datum.ureg
+
+DATUMS = [
+    Datum('m1', 1.5, 'kg'),
+    Datum('T', 25, 'degC'),
+    Datum('m2', 0.1 + 0.2, 'kilogram'),
+    Datum('m1', -3e-300, 'g'),
+    Datum('n', 0, ''),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    p = tmp_path / 'datums.qcd'
+    DatumFile.write(p, DATUMS)
+    return p
+
+
+# ============================================================================================================ round-trip
+@pytest.mark.parametrize("mmap", [pytest.param(True, id='mmap'), pytest.param(False, id='in-memory')])
+def test_round_trip(path, mmap):
+    with DatumFile(path, mmap=mmap) as df:
+        assert len(df) == len(DATUMS)
+
+        for d, expected in zip(df, DATUMS):
+            assert d.symbol == expected.symbol
+            assert d.magnitude == expected.magnitude  # exact
+            assert d.units == expected.units
+
+def test_interning(path):
+    with DatumFile(path) as df:
+        assert df.symbol_table == ('m1', 'T', 'm2', 'n')
+        assert df.unit_table == (ur.Unit('kg'), ur.Unit('degC'), ur.Unit('g'), ur.Unit(''))
+        assert df.symbol_index.tolist() == [0, 1, 2, 0, 3]
+        assert df.unit_index.tolist() == [0, 1, 0, 2, 3]
+
+def test_columns(tmp_path):
+    p = tmp_path / 'columns.qcd'
+    columns = Datum.from_strings(['x = 1 m', 'y = 2.5 s', 'x = 3 cm'], columnar=True)
+    DatumFile.write(p, columns)
+
+    with DatumFile(p) as df:
+        symbols, magnitudes, units = df.columns()
+        assert symbols.tolist() == ['x', 'y', 'x']
+        assert magnitudes.tolist() == [1.0, 2.5, 3.0]
+        assert units.tolist() == [ur.Unit('m'), ur.Unit('s'), ur.Unit('cm')]
+
+def test_empty(tmp_path):
+    p = tmp_path / 'empty.qcd'
+    DatumFile.write(p, [])
+
+    with DatumFile(p) as df:
+        assert len(df) == 0
+        assert list(df) == []
+
+
+# ================================================================================================================ views
+def test_memory_mapped(path):
+    with DatumFile(path) as df:
+        assert isinstance(df.magnitudes, np.memmap)
+        assert df.magnitudes.dtype == np.float64
+
+        with pytest.raises(ValueError):
+            df.magnitudes[0] = 1.0
+
+def test_in_memory_read_only(path):
+    with DatumFile(path, mmap=False) as df:
+        assert not isinstance(df.magnitudes, np.memmap)
+
+        with pytest.raises(ValueError):
+            df.magnitudes[0] = 1.0
+
+def test_views_after_close(path):
+    df = DatumFile(path)
+    magnitudes = df.magnitudes
+    df.close()
+
+    assert len(df) == 0
+    assert magnitudes.tolist() == [d.magnitude for d in DATUMS]
+
+    with DatumFile(path) as df:
+        symbols, magnitudes, units = df.columns()
+
+    assert symbols.tolist() == [d.symbol for d in DATUMS]
+    assert magnitudes.tolist() == [d.magnitude for d in DATUMS]
+
+
+# =========================================================================================================== exceptions
+def test_not_a_datum_file(tmp_path):
+    p = tmp_path / 'text.qcd'
+    p.write_text('x = 1 m')
+
+    with pytest.raises(ValueError):
+        DatumFile(p)
+
+@pytest.mark.parametrize(
+    "datums, exception",
+    [
+        pytest.param([Datum('x', [1, 2], 'm')], TypeError, id='array-magnitude'),
+        pytest.param((['x', 'y'], [1.0], ['m', 'm']), ValueError, id='column-lengths'),
+        pytest.param((['x', 'N'], [1.0, 2.0], ['m', 'm']), InitializationError, id='sympy-name'),
+        pytest.param((['x', ' '], [1.0, 2.0], ['m', 'm']), InitializationError, id='forbidden-symbol'),
+    ]
+)
+def test_write_exceptions(tmp_path, datums, exception):
+    with pytest.raises(exception):
+        DatumFile.write(tmp_path / 'invalid.qcd', datums)
+
+@pytest.mark.parametrize("symbol", [pytest.param('N', id='sympy-name'), pytest.param(' ', id='forbidden-symbol')])
+def test_invalid_symbol_table(path, symbol):
+    """A corrupted symbol table is rejected on open instead of creating invalid Datums."""
+    data = path.read_bytes()
+    # 'm1' is the first entry of the symbol table; replace it with a symbol of the same length
+    path.write_bytes(data.replace(b'\x02\x00\x00\x00m1', b'\x02\x00\x00\x00' + symbol.encode() + b' ', 1))
+
+    with pytest.raises(InitializationError):
+        DatumFile(path)
@@ -15,6 +15,8 @@ from QCalculator.Exceptions.FormulaExceptions import (
 import pint
 
 import pytest
+import sys
+import numpy as np
 from sympy import Eq, Symbol
 from contextlib import nullcontext
 from dataclasses import dataclass
@@ -333,6 +335,64 @@ def test_consistency_errors(f1, data, expected, exception, silent_failure):
     )
 
 
+@pytest.mark.parametrize("compiled", [pytest.param(True, id='compiled'), pytest.param(False, id='substitution')])
+@pytest.mark.parametrize(
+    "formula, data, expected",
+    [
+        pytest.param('y = sqrt(x)', {Datum('y', 3, ''), Datum('x', 9, '')}, True, id='consistent'),
+        pytest.param('y = sqrt(x)', {Datum('y', 3, ''), Datum('x', 9.1, '')}, False, id='inconsistent'),
+        pytest.param('y - x = 0', {Datum('y', 1e-16, ''), Datum('x', 0, '')}, True, id='abs-tol'),
+        pytest.param('y = besselj(0, x)', {Datum('y', 0.7651976865579666, ''), Datum('x', 1, '')}, True, id='not-in-math'),
+    ]
+)
+def test_consistency_check_compiled(formula, data, expected, compiled):
+    f = Formula(formula, compiled=compiled)
+    f._data = data
+    assert f.consistency_check(raise_exception=False) is expected
+
+def test_consistency_check_without_subs(f1, monkeypatch):
+    f1._data = {PD.df, PD.C1, PD.C2}
+
+    def fail(*args, **kwargs):
+        raise AssertionError('sympy subs() must not be called for a compiled formula.')
+
+    monkeypatch.setattr(type(f1._eq.lhs), 'subs', fail)
+    assert f1.consistency_check()
+
+@pytest.mark.parametrize(
+    "columns, expected",
+    [
+        pytest.param(
+            {'df': ([2.5, 2.5, 2], ''), 'C1': ([1.2, 1.2, 1], 'M'), 'C2': ([480, 560, 500], 'mM')},
+            [True, False, True],
+            id='units'
+        ),
+        pytest.param({'df': (2.5, ''), 'C1': ([1.2, 2.4], 'M'), 'C2': ([0.48, 0.96], 'M')}, [True, True], id='broadcast'),
+        pytest.param({'df': ([2.5], ''), 'C1': ([1.2], 'M'), 'C2': ([0], 'M')}, [False], id='division-by-zero'),
+    ]
+)
+def test_consistency_batch(f1, columns, expected):
+    assert f1.consistency_batch(columns).tolist() == expected
+
+def test_consistency_not_in_math():
+    f = Formula('y = besselj(0, x)')
+    f.write('x = 1', 'y = 0.7651976865579666')
+
+    assert f.consistency_check()
+    assert f.consistency_batch({'x': ([1, 1], ''), 'y': ([0.7651976865579666, 0.5], '')}).tolist() == [True, False]
+
+@pytest.mark.parametrize(
+    "columns, exception",
+    [
+        pytest.param({'df': ([2.5], ''), 'C1': ([1.2], 'M')}, FailedConsistencyCheck, id='FailedConsistencyCheck'),
+        pytest.param({'df': ([2.5], ''), 'C1': ([1.2], 'M'), 'C2': ([0.48], 'L')}, IncompatibleUnitsError, id='IncompatibleUnitsError'),
+    ]
+)
+def test_consistency_batch_exceptions(f1, columns, exception):
+    with pytest.raises(exception):
+        f1.consistency_batch(columns)
+
+
 # ============================================================================================================ has_value
 def _assert_has_value(f1, data, var, *, expected, exception=None):
     with exception_handling(exception):
@@ -463,6 +523,33 @@ def test_eval_symbolic(f1):
 def test_eval_preset_filters(f, data, target, filters, expected):
     _assert_eval(f, data, target=target, filters=filters, symbolic=False, expected=expected)
 
+@pytest.mark.parametrize(
+    "name, values, expected",
+    [
+        pytest.param('real', [1.0, 1 + 1e-15j, 1j, -2.0, np.nan], [True, True, False, True, False], id='real'),
+        pytest.param('positive', [1.0, 0.0, -1.0, 1 + 1j], [True, False, False, False], id='positive'),
+        pytest.param('negative', [1.0, 0.0, -1.0, -1 + 1j], [False, False, True, False], id='negative'),
+        pytest.param('non-negative', [1.0, 0.0, -1.0, 1j], [True, True, False, False], id='non-negative'),
+        pytest.param('non-positive', [1.0, 0.0, -1.0, -1j], [False, True, True, False], id='non-positive'),
+        pytest.param('zero', [1.0, 0.0, -1.0, -0.0, 1e-300], [False, True, False, True, False], id='zero'),
+        pytest.param('none', [1.0, 0.0, 1j], [True, True, True], id='none'),
+    ]
+)
+def test_filters(name, values, expected):
+    fil = Formula.as_filter(name)
+
+    assert [bool(fil(v)) for v in values] == expected
+    assert fil(np.array(values, dtype=complex)).tolist() == expected
+
+def test_filters_by_name():
+    f = Formula('y = x**2 + 5*x - 6')
+    f.write('y = 0')
+    f.target = 'x = 0.1'
+
+    assert f.eval('real', 'negative') == f.eval(Formula.REAL_ONLY, Formula.NEGATIVES) == {-6.0}
+    with pytest.raises(ValueError):
+        f.eval('imaginary')
+
 @pytest.mark.parametrize(
     "data, target, exception",
     [
@@ -473,6 +560,66 @@ def test_eval_preset_filters(f, data, target, filters, expected):
 def test_eval_exceptions(f1, data, target, exception):
     _assert_eval(f1, data, target=target, filters=[Formula.NO_FILTER], exception=exception, expected=None, symbolic=False)
 
+# ============================================================================================================= compiled
+@pytest.mark.parametrize(
+    "formula, data, target, filters",
+    [
+        pytest.param('df = C1/C2', {PD.C1, PD.C2}, TS.df, [], id='monomial'),
+        pytest.param('y = x**2 + 5*x - 6', {Datum('y', 0.0, '')}, Datum('x', 0.1, ''), [Formula.NEGATIVES], id='quadratic'),
+        pytest.param('y = x**2 + 1', {Datum('y', 0.0, '')}, Datum('x', 0.1, ''), [Formula.REAL_ONLY], id='complex-roots'),
+        pytest.param('df = C1/C2', {PD.C1, Datum('df', 0.0, '')}, TS.C2, [], id='division-by-zero'),
+        pytest.param('y = erf(x)', {Datum('y', 0.5, '')}, Datum('x', 0.1, ''), [], id='not-in-math-erfinv'),
+        pytest.param('y = besselj(0, x)', {Datum('x', 1, '')}, Datum('y', 0.1, ''), [], id='not-in-math-besselj'),
+        pytest.param('y = sqrt(x)', {Datum('y', -2, '')}, Datum('x', 0.1, ''), [], id='spurious-square-root'),
+        pytest.param('y = x**(1/3)', {Datum('y', -2, '')}, Datum('x', 0.1, ''), [], id='spurious-cube-root'),
+        pytest.param('y = sqrt(x) + 1', {Datum('y', -1, '')}, Datum('x', 0.1, ''), [], id='spurious-shifted-root'),
+    ]
+)
+def test_compiled_matches_symbolic(formula, data, target, filters):
+    results = list()
+
+    for compiled in (True, False):
+        f = Formula(formula, compiled=compiled)
+        f._data = data
+        f._target = target
+        results.append(f.eval(*filters))
+
+    assert results[0] == results[1]
+
+@pytest.mark.parametrize(
+    "formula, y, expected",
+    [
+        pytest.param('y = sqrt(x)', -2, [], id='square-root'),
+        pytest.param('y = x**(1/3)', -2, [], id='cube-root'),
+        pytest.param('y = sqrt(x) + 1', -1, [], id='shifted-root'),
+        pytest.param('y = sqrt(x) + 1', 3, [4.0], id='valid-root'),
+        pytest.param('y = exp(x) - 2e6', 0, [np.log(2e6)], id='cancelling-sides'),
+    ]
+)
+def test_compiled_spurious_roots(formula, y, expected):
+    """The general closed-form solutions that do not solve the equation for the values are dropped."""
+    f = Formula(formula)
+    f.write(f'y = {y}')
+    f.target = 'x = 0.1'
+
+    assert f._compile('x') is not None
+    assert sorted(f.eval()) == pytest.approx(expected)
+
+def test_compiled_solves_once(f1, monkeypatch):
+    f1._data = {PD.df, PD.C1}
+    f1._target = TS.C2
+    first = f1.eval()
+    (sol,) = first
+    assert sol == pytest.approx(PD.C2.magnitude * 1000)  # base units: mole/m**3
+
+    def fail(*args, **kwargs):
+        raise AssertionError('sympy solve() must not be called for a compiled formula.')
+
+    monkeypatch.setattr(sys.modules['QCalculator.Formula'], 'solve', fail)
+    assert f1.eval() == first
+    assert Formula._COMPILED[(f1._eq, 'C2')] is not None
+
+
 # ================================================================================================================ solve
 def _assert_solve(f1, data, *, target, rounding, expected, exception=None, round_to=2):
     # filters are not tested since they are directly passed to the eval() function
@@ -521,6 +668,275 @@ def test_solve_exceptions(f1, data, target, exception):
 
 
 
+@pytest.mark.parametrize(
+    "formula, expected",
+    [
+        pytest.param('n = mps/M', (1.0, {'n': 1, 'mps': -1, 'M': 1}), id='quotient'),
+        pytest.param('p*V = 2*n*R*T', (2.0, {'p': 1, 'V': 1, 'n': -1, 'R': -1, 'T': -1}), id='product-with-coefficient'),
+        pytest.param('-x = 3*y**(1/2)', (-3.0, {'x': 1, 'y': -0.5}), id='rational-exponent'),
+        pytest.param('y = x**2 + 5*x + 6', None, id='polynomial'),
+        pytest.param('y = exp(x)', None, id='transcendental'),
+        pytest.param('x = x*y', None, id='cancelling-variable'),
+    ]
+)
+def test_as_monomial(formula, expected):
+    assert Formula(formula)._monomial == expected
+
+@pytest.mark.parametrize(
+    "formula, symbol, values, expected",
+    [
+        pytest.param('df = C1/C2', 'df', {'C1': 1.2, 'C2': 0.48}, [2.5], id='exponent-1'),
+        pytest.param('df = C1/C2', 'C2', {'C1': 1.2, 'df': 2.5}, [0.48], id='exponent-minus-1'),
+        pytest.param('x = 4*y**(1/2)', 'x', {'y': 9}, [12], id='rational-exponent'),
+        pytest.param('x = 4*y**(1/2)', 'x', {'y': -9}, None, id='negative-under-root'),
+        pytest.param('x = 4*y**(1/2)', 'y', {'x': 12}, None, id='target-exponent-not-1'),
+        pytest.param('df = C1/C2', 'C2', {'C1': 1.2, 'df': 0}, None, id='division-by-zero'),
+        pytest.param('y = x**2 + 1', 'y', {'x': 2}, None, id='not-monomial'),
+    ]
+)
+def test_monomial_eval(formula, symbol, values, expected):
+    res = Formula(formula)._monomial_eval(symbol, values)
+
+    if expected is None:
+        assert res is None
+    else:
+        assert res == pytest.approx(expected)
+
+@pytest.mark.parametrize(
+    "unknowns, values, expected",
+    [
+        pytest.param({'p'}, {'V': 2, 'n': 3, 'R': 4, 'T': 5}, [2, -60], id='linear-in-one'),
+        pytest.param({'n', 'T'}, None, None, id='not-linear'),
+    ]
+)
+def test_linear_form(unknowns, values, expected):
+    linear = Formula('p*V = n*R*T')._linear_form(unknowns)
+
+    if expected is None:
+        assert linear is None
+    else:
+        args, func = linear
+        assert func(*[values[a] for a in args]) == expected
+
+@pytest.mark.parametrize(
+    "formula, symbol, expected",
+    [
+        pytest.param('y = x*exp(x)', 'x', True, id='transcendental'),
+        pytest.param('y = x**5 - 5*x', 'x', False, id='quintic'),
+        pytest.param('y = x**6 + 1/x', 'x', False, id='rational-high-degree'),
+        pytest.param('y = x**2 + 5*x + 6', 'x', True, id='quadratic'),
+        pytest.param('y = 1/x + x', 'x', True, id='rational'),
+        pytest.param('y = x*exp(x)', 'y', True, id='single-occurrence'),
+    ]
+)
+def test_symbolic_feasible(formula, symbol, expected):
+    assert Formula(formula)._symbolic_feasible(symbol) == expected
+
+@pytest.mark.parametrize(
+    "formula, values, filters, expected",
+    [
+        pytest.param('y = x*exp(x)', {'y': 2}, [], [0.852605502], id='transcendental'),
+        pytest.param('y = x**5 - 5*x', {'y': 0}, [], [-5**0.25, 0, 5**0.25], id='quintic'),
+        pytest.param('y = x**5 - 5*x', {'y': 0}, [Formula.POSITIVES], [5**0.25], id='quintic-positives'),
+        pytest.param('y = x**5 - 5*x', {'y': 0}, [Formula.NEGATIVES], [-5**0.25], id='quintic-negatives'),
+        pytest.param('y = x**6 + 6.02e23*x**3', {'y': 1e30}, [Formula.REAL_ONLY], [-8.44369e7, 118.4317],
+                     id='wide-range'),
+        pytest.param('y = exp(x) + x**2', {'y': 0}, [], [], id='no-real-roots'),
+        pytest.param('y = sin(x) + x/10', {'y': 0.5}, [Formula.NEGATIVES], [-4.872344187, -4.349793494],
+                     id='roots-between-grid-points'),
+        pytest.param('y = x**2*log(x)', {'y': 1e70}, [], [1.129316418e34], id='beyond-grid'),
+    ]
+)
+def test_numeric_eval(formula, values, filters, expected):
+    res = Formula(formula)._numeric_eval('x', values, filters)
+    assert sorted(res) == pytest.approx(expected, rel=1e-4)
+
+def test_numeric_eval_in_eval():
+    f = Formula('y = sin(x) + x/10')
+    f.write('y = 0.5')
+    f.target = 'x = 1'
+
+    assert f._solutions('x') is None
+    assert f._polynomial('x') is None
+    assert sorted(f.eval(Formula.NEGATIVES)) == pytest.approx([-4.872344187, -4.349793494])
+
+@pytest.mark.parametrize(
+    "formula, y, expected",
+    [
+        pytest.param('y = x*exp(x)', 2, 0.852605502, id='lambert-w'),
+        pytest.param('y = x**2*log(x)', 1e70, 1.129316418e34, id='lambert-w-large'),
+    ]
+)
+def test_eval_mpmath_solutions(formula, y, expected, monkeypatch):
+    """The solutions using functions that the math module lacks (LambertW) are compiled with mpmath."""
+    f = Formula(formula)
+    f.write(f'y = {y}')
+    f.target = 'x = 1'
+    f._compile('x')
+
+    def fail(*args, **kwargs):
+        raise AssertionError('sympy solve() must not be called for a compiled formula.')
+
+    monkeypatch.setattr(sys.modules['QCalculator.Formula'], 'solve', fail)
+    (sol,) = f.eval()
+    assert sol == pytest.approx(expected)
+
+@pytest.mark.parametrize(
+    "formula, y, expected",
+    [
+        pytest.param('y = Abs(x)', 2, [-2, 2], id='abs'),
+        pytest.param('y = x*Abs(x)', 2, [2**0.5], id='product-with-abs'),
+        pytest.param('y = Abs(x)', -2, [], id='abs-no-roots'),
+    ]
+)
+def test_eval_not_printable(formula, y, expected):
+    """Abs cannot be printed for the math module; such equations are solved numerically."""
+    f = Formula(formula)
+    f.write(f'y = {y}')
+    f.target = 'x = 1'
+
+    assert sorted(f.eval()) == pytest.approx(expected)
+
+@pytest.mark.parametrize(
+    "formula, degree",
+    [
+        pytest.param('y = x**2 + 5*x + 6', 2, id='quadratic'),
+        pytest.param('y = a*x**5 - exp(b)*x', 5, id='symbolic-coefficients'),
+        pytest.param('y = 2*x + 1', None, id='linear'),
+        pytest.param('y = x**2 + exp(x)', None, id='transcendental'),
+        pytest.param('y = x**2 + 1/x', None, id='rational'),
+    ]
+)
+def test_polynomial(formula, degree):
+    polynomial = Formula(formula)._polynomial('x')
+
+    if degree is None:
+        assert polynomial is None
+    else:
+        assert polynomial[1] == degree
+
+@pytest.mark.parametrize(
+    "coeffs, expected",
+    [
+        pytest.param([[1, 5, 6]], [[-3, -2]], id='quadratic'),
+        pytest.param([[1, 0, 1]], [[-1j, 1j]], id='complex-pair'),
+        pytest.param([[1, -6, 11, -6], [2, -2, 0, 0]], [[1, 2, 3], [0, 0, 1]], id='cubics'),
+        pytest.param([[1, -4, 5, -2]], [[1, 1, 2]], id='double-root'),
+        pytest.param([[1, 0, -3, 2]], [[-2, 1, 1]], id='double-root-exact'),
+        pytest.param([[1, -3, 3, -1], [1, -5, 9, -7, 2]], [[1, 1, 1, np.nan], [1, 1, 1, 2]], id='triple-root'),
+        pytest.param([[1, -2.00001, 1.00001]], [[1, 1.00001]], id='close-roots'),
+        pytest.param([[0, 1, -5, 6]], [[2, 3, np.nan]], id='zero-leading-coefficient'),
+        pytest.param([[0, 0, 0], [1, np.nan, 0]], [[np.nan, np.nan], [np.nan, np.nan]], id='no-roots'),
+    ]
+)
+def test_polynomial_roots(coeffs, expected):
+    width = max(len(row) for row in coeffs)
+    coeffs = [[0] * (width - len(row)) + row for row in coeffs]
+    res = Formula._polynomial_roots(np.array(coeffs, dtype=float))
+    np.testing.assert_allclose(res, expected, atol=1e-9)
+
+@pytest.mark.parametrize(
+    "formula, expected",
+    [
+        pytest.param('y = (x - 1)**2*(x + 2)', {1.0, -2.0}, id='double-root'),
+        pytest.param('y = (x - 1)**3', {1.0}, id='triple-root'),
+        pytest.param('y = (x - 3)**4', {3.0}, id='quadruple-root'),
+    ]
+)
+def test_polynomial_multiple_roots(formula, expected):
+    f = Formula(formula)
+    f.write('y = 0')
+    f.target = 'x = 1'
+
+    assert f.eval(Formula.REAL_ONLY) == expected  # exact, one value per root
+    assert len(f.solve(Formula.POSITIVES, rounding=False)) == 1
+
+def test_polynomial_eval():
+    f = Formula('y = x**5 - 5*x')
+    f.write('y = 0')
+    f.target = 'x = 1'
+
+    assert f._compile('x') is None
+    assert sorted(f.eval(Formula.REAL_ONLY)) == pytest.approx([-5**0.25, 0, 5**0.25])
+
+
+# ========================================================================================================== solve_batch
+@pytest.mark.parametrize(
+    "columns, filters, target, expected",
+    [
+        pytest.param(
+            {'df': ([2.5, 5.0], ''), 'C1': ([1.2, 1.2], 'M')}, [], None, [[0.48], [0.24]],
+            id='ref-units'
+        ),
+        pytest.param(
+            {'df': ([2.5, 5.0], ''), 'C1': ([1200, 1200], 'mmol/L')}, [], 'C2 = 0.1 mmol/L', [[480], [240]],
+            id='target-units'
+        ),
+        pytest.param(
+            {'C1': ([1.2, 0.0], 'M'), 'C2': ([0.48, 0.0], 'M')}, [], None, [[2.5], [np.nan]],
+            id='division-by-zero'
+        ),
+        pytest.param(
+            {'df': ([2.5, 2.5], ''), 'C1': ([1.2, -1.2], 'M')}, [Formula.POSITIVES], None, [[0.48], [np.nan]],
+            id='element-wise-filter'
+        ),
+    ]
+)
+def test_solve_batch(f1, columns, filters, target, expected):
+    res = f1.solve_batch(columns, *filters, target=target)
+    np.testing.assert_allclose(res, expected)
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        pytest.param([], [[-6, 1], [np.nan, np.nan]], id='real-only'),
+        pytest.param([Formula.REAL_ONLY, Formula.NEGATIVES], [[-6, np.nan], [np.nan, np.nan]], id='negatives'),
+    ]
+)
+def test_solve_batch_several_solutions(filters, expected):
+    f = Formula('y = x**2 + 5*x - 6')
+    res = f.solve_batch({'y': ([0, -100], '')}, *filters, target='x = 0.1')
+    np.testing.assert_allclose(np.sort(res, axis=1), expected)
+
+def test_solve_batch_polynomial():
+    f = Formula('y = x**3 - 6*x**2 + 11*x')
+    res = f.solve_batch({'y': ([6, 0, 30], '')}, Formula.NON_NEG, target='x = 0.1')
+    np.testing.assert_allclose(res, [[1, 2, 3], [0, np.nan, np.nan], [np.nan, np.nan, 5]])
+
+@pytest.mark.parametrize(
+    "formula, y, expected",
+    [
+        pytest.param('y = sqrt(x)', [-2, 2, 3], [[np.nan], [4], [9]], id='square-root'),
+        pytest.param('y = sqrt(x) + 1', [-1, 3], [[np.nan], [4]], id='shifted-root'),
+    ]
+)
+def test_solve_batch_spurious_roots(formula, y, expected):
+    """The rows where the general closed-form solution does not solve the equation are NaN."""
+    res = Formula(formula).solve_batch({'y': (y, '')}, target='x = 0.1')
+    np.testing.assert_allclose(res, expected, rtol=1e-6)
+
+def test_solve_batch_matches_solve(f1):
+    f1._data = {PD.df, PD.C1}
+    (expected,) = f1.solve(rounding=False)
+
+    res = f1.solve_batch({'df': ([PD.df.magnitude], ''), 'C1': ([PD.C1.magnitude], 'M')})
+    assert res[0, 0] == pytest.approx(expected.magnitude)
+
+@pytest.mark.parametrize(
+    "columns, target, exception",
+    [
+        pytest.param({'df': ([2.5], '')}, None, EquationNotSolvable, id='EquationNotSolvable'),
+        pytest.param({'df': ([2.5], ''), 'C1': ([1.2], 'M'), 'C2': ([0.48], 'M')}, None, UnknownNotFound, id='UnknownNotFound'),
+        pytest.param({'df': ([2.5], ''), 'C1': ([1.2], 'M')}, 'df = 0.1', UnknownNotFound, id='target-in-columns'),
+        pytest.param({'df': ([2.5], ''), 'C1': ([1.2], 'L')}, None, IncompatibleUnitsError, id='IncompatibleUnitsError'),
+        pytest.param({'df': ([2.5], ''), 'V0': ([1.2], 'L')}, None, SymbolNotFound, id='SymbolNotFound'),
+    ]
+)
+def test_solve_batch_exceptions(f1, columns, target, exception):
+    with pytest.raises(exception):
+        f1.solve_batch(columns, target=target)
+
+
 # =========================================================================================================== PROPERTIES
 # ============================================================================================= target getter and setter
 @pytest.mark.parametrize(
@@ -579,18 +995,64 @@ def test_unknown(f1, data, expected, exception):
         f1._data = data
         assert f1.unknown == expected
 
+def test_missing_values_count(f1):
+    f1.write(PD.df, PD.C1)
+    assert (f1.solvable, f1.all_values, f1.unknown) == (True, False, 'C2')
+
+    f1.write(PD.C2)
+    assert (f1.solvable, f1.all_values) == (True, True)
+
+    f1.erase('C1')
+    f1.erase('df')
+    assert (f1.solvable, f1.all_values) == (False, False)
+
+    f1.erase('C2')
+    assert f1._missing == len(f1.symbols) and not f1._values
+
 def test_data(f1):
     f1._data = {PD.df, PD.C1, PD.C2}
     assert f1.data == {PD.df, PD.C1, PD.C2}
 
-    # check that affecting copies of the _data does not affect _data itself
-    f1.data.pop()
+    # the returned set is a read-only view
+    with pytest.raises(AttributeError):
+        f1.data.pop()
     assert f1.data == {PD.df, PD.C1, PD.C2}
 
+def test_data_shares_instances(f1):
+    """The view is a read-only set of the live Datum instances."""
+    f1.write(PD.df, PD.C1)
+    assert {id(d) for d in f1.data} == {id(d) for d in f1._values.values()}
+
+def test_copy(f1):
+    f1.write(PD.df, PD.C1)
+    f1.target = TS.C2
+    f = f1.copy()
+
+    assert f == f1 and f.data == f1.data and f.target == f1.target
+
+    # changing the copy does not affect the original
+    f.erase('df')
+    next(iter(f.data)).ito('mmol/L')
+    assert f1.data == {PD.df, PD.C1}
+    assert f1.read('C1').units == PD.C1.units
+
 def test_symbols(f1):
     f1._data = {PD.df, PD.C1, PD.C2}
     assert f1.symbols == {'df', 'C1', 'C2'}
 
+def test_symbol_views(f1):
+    assert f1.symbol_tuple == ('C1', 'C2', 'df')
+    assert dict(f1.symbol_index) == {'C1': 0, 'C2': 1, 'df': 2}
+    assert f1.symbols is f1.symbols  # computed once
+
+    with pytest.raises(TypeError):
+        f1.symbol_index['V0'] = 3
+    with pytest.raises(AttributeError):
+        f1.symbols.add('V0')
+
+def test_hash(f1):
+    assert hash(f1) == hash(Formula('df = C1/C2')) == hash(f1.eq_str)
+
 def test_eq_str(f1):
     assert f1.eq_str == 'df = C1/C2'
     assert f1.eq == Eq(Symbol('df'), Symbol('C1')/Symbol('C2'))
@@ -1,6 +1,7 @@
 from QCalculator import LinearIterator, Formula, Datum
+from QCalculator.LinearIterator import PlanStep, BlockStep
 from QCalculator.Exceptions.DatumExceptions import InitializationError, InvalidSymbol
-from QCalculator.Exceptions.FormulaExceptions import NoneReferenceUnits
+from QCalculator.Exceptions.FormulaExceptions import NoneReferenceUnits, ConsistencyError
 from QCalculator.Exceptions.LinearIteratorExceptions import (
     NoValueError,
     FormulasNotIndicated,
@@ -14,6 +15,7 @@ import pytest
 from contextlib import nullcontext
 import pint
 from copy import deepcopy
+import numpy as np
 
 # ============================================================================================= PRESET DATA AND FIXTURES
 def dict_is_subset(sub, sup):
@@ -595,6 +597,364 @@ def test_solve(li1, data, target, expected_return, expected_data, exception):
         assert li1._data == expected_data
 
 
+def test_solve_without_valid_solutions():
+    """A spurious root of the general solution is not written, so the target is reported as unreachable."""
+    li = LinearIterator(['v = sqrt(2*K/m)'], {'v': 'm/s', 'K': 'J', 'm': 'kg'})
+    li.write('v = -3 m/s', 'm = 2 kg')
+    li.target = 'K = 1 J'
+
+    with pytest.raises(UnreachableTarget):
+        li.solve()
+    assert li._data == {Datum('v', -3, 'm/s'), Datum('m', 2, 'kg')}
+
+def test_solve_stops_without_real_solutions():
+    li = LinearIterator(['y = x**2 + 1', 'z = 2*x'], {'x': '', 'y': '', 'z': ''})
+    li.write('y = 0')
+    assert li.solve() is None
+    assert li._data == {Datum('y', 0, '')}
+
+
+# ================================================================================================================ plan
+def test_plan(li1):
+    plan = li1.plan(['n', 'M', 'NA', 'wmm'])
+
+    assert plan == (
+        PlanStep(0, Formula('n = Np/NA'), 'Np'),
+        PlanStep(0, Formula('n = mps/M'), 'mps'),
+        PlanStep(1, Formula('wmm = mps/msm'), 'msm'),
+    )
+    assert li1.plan({'wmm', 'NA', 'M', 'n'}) is plan  # cached by the set of known symbols
+    assert li1._data == set()  # no numeric work is done
+
+def test_plan_shared_unknown(li1):
+    """Two Formulas that can give the same unknown at the same stage: only one of them is planned."""
+    plan = li1.plan(['mps', 'M', 'Np', 'NA'])
+    assert [(step.stage, step.symbol) for step in plan] == [(0, 'n')]
+
+@pytest.mark.parametrize(
+    "known, exception",
+    [
+        pytest.param(['n', 'p'], UnusedSymbolError, id='unused-symbol'),
+        pytest.param([''], InvalidSymbol, id='invalid-symbol'),
+    ]
+)
+def test_plan_exceptions(li1, known, exception):
+    with pytest.raises(exception):
+        li1.plan(known)
+
+def test_solve_uses_plan(li1, data):
+    li1.write(*data)
+    li1.solve()
+    assert frozenset(['n', 'M', 'NA', 'wmm']) in li1._plans
+
+
+# ====================================================================================================== coupled blocks
+@pytest.fixture
+def li_blocks():
+    return LinearIterator(['a + b = s', 'a - b = d', 'c = a*b'], {'a': '', 'b': '', 's': '', 'd': '', 'c': ''})
+
+def test_plan_block(li_blocks):
+    plan = li_blocks.plan(['s', 'd'])
+
+    assert plan == (
+        BlockStep(0, (Formula('a + b = s'), Formula('a - b = d')), ('a', 'b')),
+        PlanStep(1, Formula('c = a*b'), 'c'),
+    )
+
+def test_solve_block(li_blocks):
+    li_blocks.write('s = 10', 'd = 4')
+    li_blocks.target = 'c = 0.1'
+
+    assert li_blocks.solve() == Datum('c', 21, '')
+    assert li_blocks._data == {
+        Datum('s', 10, ''), Datum('d', 4, ''), Datum('a', 7, ''), Datum('b', 3, ''), Datum('c', 21, '')
+    }
+
+def test_solve_block_units():
+    li = LinearIterator(['a + b = s', 'a - b = d'], {'a': 'm', 'b': 'm', 's': 'cm', 'd': 'cm'})
+    li.write('s = 10 cm', 'd = 4 mm')
+    li.solve()
+
+    assert li.read(['a', 'b']) == [Datum('a', 0.052, 'm'), Datum('b', 0.048, 'm')]
+    assert li.read('a').units == Datum.ureg.Unit('m')
+
+def test_solve_block_ambiguous():
+    """A nonlinear block with two real solutions does not give values."""
+    li = LinearIterator(['x*y = p', 'x + y = q'], {'x': '', 'y': '', 'p': '', 'q': ''})
+    li.write('p = 6', 'q = 5')
+    li.target = 'x = 0.1'
+
+    with pytest.raises(UnreachableTarget):
+        li.solve()
+
+def test_solve_block_without_units():
+    """Without reference units the coupled blocks are not planned, so the target cannot be reached."""
+    li = LinearIterator(['a + b = s', 'a - b = d', 'c = a*2'])
+    li.write('s = 10', 'd = 4')
+    li.target = 'c = 0.1'
+
+    assert li.plan(['s', 'd']) == tuple()
+    with pytest.raises(UnreachableTarget):
+        li.solve()
+
+def test_block_size(li_blocks):
+    li_blocks.BLOCK_SIZE = 1
+    assert li_blocks.plan(['s', 'd']) == tuple()
+
+def test_solve_many_block(li_blocks):
+    res = li_blocks.solve_many({'s': [10, 2, np.nan], 'd': [4, 0, 1], 'c': [np.nan, np.nan, 3]})
+
+    np.testing.assert_allclose(res['a'].filled(np.nan), [7, 1, np.nan])
+    np.testing.assert_allclose(res['b'].filled(np.nan), [3, 1, np.nan])
+    np.testing.assert_allclose(res['c'].filled(np.nan), [21, 1, 3])
+
+
+# ======================================================================================================== solve_linear
+def test_solve_linear():
+    li = LinearIterator(['x + y = 10*z', 'x - y = w', 'u + v = x'], {s: 'm' for s in 'xyzwuv'})
+    li.write('z = 1 m', 'w = 20 cm')
+
+    res = li.solve_linear()
+
+    assert res.determined == {Datum('x', 5.1, 'm'), Datum('y', 4.9, 'm')}
+    assert res.underdetermined == {'u', 'v'}
+    assert li.read('x') == Datum('x', 5.1, 'm')
+
+def test_solve_linear_in_unknowns(li1, data):
+    """The Formulas only need to be linear in the unknowns: 'n = mps/M' is linear in mps when M is known."""
+    li1.write(*data)
+    res = li1.solve_linear()
+
+    assert res.determined == {Datum('mps', 27, 'g'), Datum('Np', 9.03e23, '')}
+    assert res.underdetermined == {'msm', 'Vpg', 'V0'}
+
+@pytest.mark.parametrize(
+    "formulas, values",
+    [
+        pytest.param(['x + y = a', 'x - y = b', 'x = c'], ['a = 10', 'b = 2', 'c = 5'], id='three-formulas'),
+        pytest.param(['x = c', 'x + y = a', 'y = b'], ['a = 10', 'b = 2', 'c = 5'], id='substitution'),
+    ]
+)
+def test_solve_linear_inconsistent(formulas, values):
+    """Contradicting known values raise ConsistencyError before anything is written."""
+    li = LinearIterator(formulas, {s: '' for s in 'xyabc'})
+    li.write(*values)
+    before = li.data, li.solvables
+
+    with pytest.raises(ConsistencyError):
+        li.solve_linear()
+
+    assert (li.data, li.solvables) == before
+    assert not any([f.has_value('x') for f in li._index['x']])
+
+def test_write_all_rolls_back():
+    li = LinearIterator(['y = 2*x', 'z = y + x'], {'x': '', 'y': '', 'z': ''})
+    li.write('x = 1', 'y = 2')
+
+    with pytest.raises(ConsistencyError):
+        li._write_all([Datum('z', 5, '')])
+
+    assert li.data == {Datum('x', 1, ''), Datum('y', 2, '')}
+    assert li.solvables == {Formula('z = y + x')}
+
+
+# ====================================================================================================== solve_monomial
+def test_solve_monomial(li1, data):
+    """In the logarithmic form 'wmm = mps/msm' is linear, so msm is found together with mps."""
+    li1.write(*data)
+    res = li1.solve_monomial()
+
+    assert res.determined == {Datum('mps', 27, 'g'), Datum('Np', 9.03e23, ''), Datum('msm', 108, 'g')}
+    assert res.underdetermined == {'Vpg', 'V0'}
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        pytest.param(['a = 6', 'b = 12', 'c = 8'], {'x': 2, 'y': 3, 'z': 4}, id='positive'),
+        pytest.param(['a = -6', 'b = -12', 'c = 8'], {'x': 2, 'y': -3, 'z': 4}, id='sign-from-parities'),
+    ]
+)
+def test_solve_monomial_cyclic(values, expected):
+    li = LinearIterator(['x*y = a', 'y*z = b', 'x*z = c'], {s: '' for s in 'xyzabc'})
+    li.write(*values)
+
+    res = li.solve_monomial()
+
+    assert res.underdetermined == set()
+    assert {d.symbol: abs(d.magnitude) for d in res.determined} == pytest.approx({s: abs(v) for s, v in expected.items()})
+    for f in li._formulas:
+        assert f.consistency_check()
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        pytest.param(['a = 6', 'b = 12', 'c = 8', 'd = 5'], id='magnitudes'),
+        pytest.param(['a = 6', 'b = 12', 'c = -8', 'd = 2'], id='signs'),
+    ]
+)
+def test_solve_monomial_inconsistent(values):
+    """Contradicting known values raise ConsistencyError before anything is written."""
+    li = LinearIterator(['x*y = a', 'y*z = b', 'x*z = c', 'x = d'], {s: '' for s in 'xyzabcd'})
+    li.write(*values)
+    before = li.data
+
+    with pytest.raises(ConsistencyError):
+        li.solve_monomial()
+
+    assert li.data == before
+    assert not any([f.has_value('y') for f in li._index['y']])
+
+def test_solve_monomial_skips_zero():
+    li = LinearIterator(['x*y = a', 'x = b*c'], {s: '' for s in 'xyabc'})
+    li.write('a = 6', 'b = 0', 'c = 1')
+
+    res = li.solve_monomial()
+
+    assert res.determined == set()
+    assert res.underdetermined == {'x', 'y'}
+
+
+# ========================================================================================================== solve_many
+def test_solve_many(li1):
+    """
+    Checks:
+    - That rows with the same known variables are solved together and rows with other known variables separately
+    - That missing values can be marked both by a mask and by NaN
+    - That the unreachable values are masked instead of raising UnreachableTarget
+    """
+
+    table = {
+        'n': np.ma.masked_array([1.5, 0.0, 3.0], mask=[False, True, False]),
+        'M': [18, 18, 18],
+        'NA': [6.02e23, np.nan, 6.02e23],
+        'wmm': [0.25, np.nan, 0.5],
+        'mps': np.ma.masked_array([0.0, 36.0, 0.0], mask=[True, False, True]),
+    }
+
+    res = li1.solve_many(table)
+
+    assert set(res) == li1.symbols
+    np.testing.assert_allclose(res['mps'].filled(np.nan), [27, 36, 54])
+    np.testing.assert_allclose(res['n'].filled(np.nan), [1.5, 2, 3])
+    np.testing.assert_allclose(res['msm'].filled(np.nan), [108, np.nan, 108])
+    np.testing.assert_allclose(res['Np'].filled(np.nan), [9.03e23, np.nan, 1.806e24])
+    assert res['Vpg'].mask.all()
+    assert li1._data == set()
+
+def test_solve_many_units(li1):
+    res = li1.solve_many({'mps': [0.036], 'M': [18]}, units={'mps': 'kg'})
+    assert res['mps'][0] == pytest.approx(36)
+    assert res['n'][0] == pytest.approx(2)
+
+@pytest.mark.parametrize(
+    "table, units, exception",
+    [
+        pytest.param({'p': [1.0]}, None, UnusedSymbolError, id='unused-symbol'),
+        pytest.param({'mps': [1.0]}, {'mps': 'L'}, IncompatibleUnitsError, id='incompatible-units'),
+        pytest.param({'mps': [1.0], 'M': [1.0, 2.0]}, None, ValueError, id='different-lengths'),
+    ]
+)
+def test_solve_many_exceptions(li1, table, units, exception):
+    with pytest.raises(exception):
+        li1.solve_many(table, units)
+
+
+# =============================================================================================================== verify
+def test_verify(li1, data):
+    """
+    Checks:
+    - That the Formulas with all the values are verified and the others get a NaN residual
+    - That an inconsistent value (written with force_inconsistent) is reported
+    """
+
+    li1.write(*data)
+    li1.write(*li1.iter())
+    res = li1.verify()
+
+    assert res.scenarios is None and res.inconsistent == set()
+    assert res.formulas[Formula('n = mps/M')] <= Formula.CONSISTENCY_REL_TOL
+    assert np.isnan(res.formulas[Formula('n = Vpg/V0')])
+
+    f = next(f for f in li1._index['mps'] if f == Formula('n = mps/M'))
+    f.write('mps = 28 g', rewrite=True, force_inconsistent=True)
+    li1._values['mps'] = Datum('mps', 28, 'g')
+    res = li1.verify()
+
+    assert res.inconsistent == {Formula('n = mps/M')}  # "msm" has no value yet
+    assert res.formulas[Formula('n = mps/M')] == pytest.approx(1 / 28)
+
+def test_verify_many(li1):
+    table = {'n': [1.5, 2.0, np.nan], 'M': [18, 18, 18], 'NA': [6.02e23, 6.02e23, 6.02e23], 'wmm': [0.25, 0.5, 0.5]}
+    res = li1.solve_many(table)
+    res['mps'][1] = 37  # the second scenario is not consistent
+
+    ver = li1.verify(res, units={'mps': 'g'})
+
+    assert ver.inconsistent == {Formula('n = mps/M'), Formula('wmm = mps/msm')}
+    assert ver.formulas[Formula('n = Np/NA')] <= Formula.CONSISTENCY_REL_TOL
+    assert ver.scenarios[0] <= Formula.CONSISTENCY_REL_TOL
+    assert ver.scenarios[1] == pytest.approx(1 / 37)
+    assert np.isnan(ver.scenarios[2])  # nothing can be found without "n"
+
+def test_verify_not_in_numpy():
+    li = LinearIterator(['y = besselj(0, x)', 'z = 2*y'])
+    li.write('x = 1', 'y = 0.7651976865579666')
+    res = li.verify()
+
+    assert res.inconsistent == set()
+    assert res.formulas[Formula('y = besselj(0, x)')] <= Formula.CONSISTENCY_REL_TOL
+    assert np.isnan(res.formulas[Formula('z = 2*y')])
+
+def test_verify_many_without_units():
+    li = LinearIterator(['y = 2*x'])
+    with pytest.raises(Exception):
+        li.verify({'x': [1.0], 'y': [2.0]})
+
+
+# ======================================================================================================= SYMBOL INDEX
+def test_symbol_index(li1):
+    assert li1._index['n'] == {Formula(f) for f in ['n = mps/M', 'n = Vpg/V0', 'n = Np/NA']}
+    assert li1._index['msm'] == {Formula('wmm = mps/msm')}
+    assert set(li1._unknowns.values()) == {3}
+    assert li1._ready == set()
+
+def test_ready_formulas(li1):
+    """
+    Checks:
+    - That writing a value updates the unknown counts of the Formulas that contain it only
+    - That a Formula becomes ready when one unknown is left and stops being ready when it is solved or erased
+    """
+
+    li1.write('n = 1.5 mole', 'M = 18 g/mole')
+    assert li1._ready == {Formula('n = mps/M')}
+    assert li1._unknowns[Formula('wmm = mps/msm')] == 3
+    assert li1._unknowns[Formula('n = Vpg/V0')] == 2
+
+    li1.write('mps = 27 g')
+    assert li1._ready == set()
+    assert li1._unknowns[Formula('wmm = mps/msm')] == 2
+
+    li1.erase('M')
+    assert li1._ready == {Formula('n = mps/M')}
+
+def test_ready_after_inconsistent_write():
+    """A Formula keeps a value that fails the consistency check, so the counts follow the Formula."""
+    li = LinearIterator(['y = 2*x', 'z = y + x'], {'x': '', 'y': '', 'z': ''})
+    li.write('x = 1', 'y = 2')
+
+    with pytest.raises(ConsistencyError):
+        li.write('z = 5')
+
+    assert li._unknowns[Formula('z = y + x')] == 0
+    assert li._ready == set()
+    assert li.iter() == set()
+
+    li.erase('z')
+    assert li.solvables == {Formula('z = y + x')}
+    (d,) = li.iter()
+    assert d == Datum('z', 3, '')
+
+
 # =========================================================================================================== PROPERTIES
 def test_solvables(li1, data):
     """
@@ -616,14 +976,15 @@ def test_data(li1, data):
     """
     Checks:
     - Whether the set returned is genuinely the one stored in _data
-    - Whether affecting **obtained** set does not change the _data set
+    - Whether the obtained set is read-only
     """
 
     li1._data = data
     assert li1.data == data
 
     d = li1.data
-    d.pop()
+    with pytest.raises(AttributeError):
+        d.pop()
     assert li1.data == data
 
 
@@ -634,15 +995,41 @@ def test_formulas(li1):
     """
     Checks:
     - That the returned set of Formulas is genuinely the set of stored formulas
-    - That changing the **obtained** set does not affect the stored set
+    - That the obtained set is read-only
     """
 
     assert li1.formulas == set([Formula(f) for f in formulas1])
 
     s = li1.formulas
-    s.pop()
+    with pytest.raises(AttributeError):
+        s.pop()
     assert li1.formulas == set([Formula(f) for f in formulas1])
 
+def test_views_share_instances(li1, data):
+    """The views are read-only sets of the live instances; .copy() gives independent ones."""
+    li1.write(*data)
+
+    formulas = {id(f) for f in li1._formulas}
+    values = {id(d) for d in li1._values.values()}
+    assert {id(f) for f in li1.formulas} == formulas
+    assert {id(d) for d in li1.data} == values
+
+    li = li1.copy()
+    assert not {id(f) for f in li.formulas} & formulas
+    assert not {id(d) for d in li.data} & values
+
+def test_copy(li1, data):
+    li1.write(*data)
+    li = li1.copy()
+
+    assert li.data == li1.data and li.formulas == li1.formulas
+
+    # changing the copy does not affect the original
+    s = next(iter(data)).symbol
+    li.erase(s)
+    assert li1.data == data
+    assert all([f.has_value(s) for f in li1._index[s]])
+
 def test_target(li1):
     t = Datum('n', 0.01, 'mole')
     li1._target = t
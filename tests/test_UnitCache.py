@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+from pint import UnitRegistry, UndefinedUnitError, DimensionalityError
+
+from QCalculator import Datum
+from QCalculator.UnitCache import UnitCache
+
+
+ur = Datum.ureg
+
+
+@pytest.fixture
+def uc():
+    return UnitCache(ur, maxsize=4)
+
+
+# ============================================================================================================ interning
+@pytest.mark.parametrize(
+    "units",
+    [
+        pytest.param(['m', 'meter', ur.Unit('meter')], id='same-units'),
+        pytest.param(['mole/L', 'mol/l', 'mole / liter'], id='same-compound-units'),
+    ]
+)
+def test_interning(units):
+    uc = UnitCache(ur)
+    first, *rest = [uc.unit(u) for u in units]
+
+    assert all([first is u for u in rest])
+
+def test_foreign_registry(uc):
+    foreign = UnitRegistry().Unit('centimeter')
+    assert uc.unit(foreign) is uc.unit('cm')
+
+def test_normalize_units_interned():
+    assert Datum.normalize_units('km') is Datum.normalize_units('kilometer')
+
+
+# ============================================================================================================ unit info
+@pytest.mark.parametrize(
+    "unit, base_units, factor, offset",
+    [
+        pytest.param('km', 'meter', 1000.0, 0.0, id='multiplicative'),
+        pytest.param('', 'dimensionless', 1.0, 0.0, id='dimensionless'),
+        pytest.param('degC', 'kelvin', 1.0, 273.15, id='offset'),
+        pytest.param('decibel', 'dimensionless', None, None, id='non-linear'),
+    ]
+)
+def test_info(uc, unit, base_units, factor, offset):
+    info = uc.info(unit)
+
+    assert info.base_units == ur.Unit(base_units)
+    assert info.dimensionality == ur.Unit(unit).dimensionality
+
+    if factor is None:
+        assert info.factor is None and info.offset is None
+    else:
+        assert info.factor == pytest.approx(factor)
+        assert info.offset == pytest.approx(offset)
+
+@pytest.mark.parametrize(
+    "u1, u2, expected",
+    [
+        pytest.param('km', 'inch', True, id='compatible'),
+        pytest.param('km', 'second', False, id='incompatible'),
+    ]
+)
+def test_is_compatible(uc, u1, u2, expected):
+    assert uc.is_compatible(u1, u2) == expected
+
+def test_datum_base_magnitude_offset_units():
+    assert Datum('T', 25, 'degC').base_magnitude == pytest.approx(298.15)
+
+
+# ========================================================================================================== conversions
+@pytest.mark.parametrize(
+    "u_from, u_to, expected",
+    [
+        pytest.param('cm', 'cm', (1.0, 0.0), id='same-units'),
+        pytest.param('km', 'm', (1000.0, 0.0), id='multiplicative'),
+        pytest.param('degC', 'degF', (1.8, 32.0), id='offset'),
+        pytest.param('km', 's', None, id='incompatible'),
+        pytest.param('decibel', '', None, id='non-linear'),
+    ]
+)
+def test_conversion(uc, u_from, u_to, expected):
+    conv = uc.conversion(u_from, u_to)
+
+    if expected is None:
+        assert conv is None
+    else:
+        assert conv == pytest.approx(expected)
+
+@pytest.mark.parametrize(
+    "magnitude, u_from, u_to, expected, exception",
+    [
+        pytest.param(2.5, 'km', 'm', 2500.0, None, id='multiplicative'),
+        pytest.param(np.array([0.0, 100.0]), 'degC', 'kelvin', np.array([273.15, 373.15]), None, id='offset-array'),
+        pytest.param(20.0, 'decibel', '', 100.0, None, id='non-linear'),
+        pytest.param(1.0, 'km', 's', None, DimensionalityError, id='DimensionalityError'),
+    ]
+)
+def test_convert(uc, magnitude, u_from, u_to, expected, exception):
+    if exception is not None:
+        with pytest.raises(exception):
+            uc.convert(magnitude, u_from, u_to)
+    else:
+        np.testing.assert_allclose(uc.convert(magnitude, u_from, u_to), expected)
+
+def test_to_base(uc):
+    assert uc.to_base(25.5, 'cm') == pytest.approx(0.255)
+
+def test_datum_to_offset_units():
+    d = Datum('T', 25, 'degC').to('degF')
+    assert d.magnitude == pytest.approx(77.0)
+    assert d.units == ur.Unit('degF')
+
+
+# ======================================================================================================== size and stats
+def test_counters(uc):
+    uc.unit('m')
+    uc.unit('m')
+    uc.unit('meter')
+
+    assert (uc.hits, uc.misses) == (1, 2)
+
+    uc.clear()
+    assert (uc.hits, uc.misses, len(uc)) == (0, 0, 0)
+
+def test_bounded_size(uc):
+    for u in ['m', 's', 'kg', 'mol', 'K', 'A']:
+        uc.unit(u)
+
+    assert len(uc) == uc.maxsize
+    assert (True, 'A') in uc._entries  # the most recent key is kept
+    assert (True, 'm') not in uc._entries  # the least recent key is dropped
+
+@pytest.mark.parametrize(
+    "unit, exception",
+    [
+        pytest.param('definitely not a unit string', UndefinedUnitError, id='UndefinedUnitError'),
+        pytest.param(2, TypeError, id='TypeError'),
+    ]
+)
+def test_exceptions(uc, unit, exception):
+    with pytest.raises(exception):
+        uc.unit(unit)
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        UnitCache(ur, maxsize=0)